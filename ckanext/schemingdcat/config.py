@@ -3,7 +3,19 @@ import re
 
 # Default values
 default_facet_operator = 'OR'
+facet_filter_tags = True
+# Solr fields with the bounding box and the simplified geometry of the spatial extent, disabled if not defined
+spatial_bbox_field = None
+spatial_geometry_field = None
+spatial_geometry_tolerance = 0.01
+# Geometry stored in the spatial field for the selected spatial_uri choices: full, simplified or bbox
+spatial_uri_geometry = 'full'
+spatial_uri_tolerance = 0.01
+# Maximum length of the spatial_uri GeoJSON, longer ones are simplified or replaced by their bbox, 0 for no limit
+spatial_uri_max_length = 100000
 icons_dir = 'images/icons'
+# Seconds between the checks for changes of the public directories indexed for the icons, 0 to never check them
+public_assets_refresh_interval = 60
 default_locale = 'en'
 organization_custom_facets = False
 group_custom_facets = False
@@ -12,7 +24,19 @@ linkeddata_links = None
 geometadata_links = None
 endpoints = None
 endpoints_yaml = 'endpoints.yaml'
+# Link tables compiled from the codelists by init_config()
+linkeddata_table = None
+geometadata_table = None
+catalog_endpoints_table = None
 facet_list_limit = 6
+# Seconds to cache the dataset lists and counts of the harvest sources, 0 to disable
+harvest_source_cache_ttl = 60
+# Seconds to cache the results of the homepage helpers (featured datasets, groups, etc.), 0 to only cache them per request
+helpers_cache_ttl = 300
+# Seconds to cache the search pages rendered for anonymous users, 0 to disable
+search_cache_ttl = 60
+# Seconds to cache the choices of the scheming fields with a choices_helper for the validators, 0 to disable
+choices_cache_ttl = 60
 default_package_item_icon = 'theme'
 default_package_item_show_spatial = True
 show_metadata_templates_toolbar = True
@@ -1,8 +1,9 @@
 import ckan.plugins as plugins
 from ckan.common import request
 import ckanext.schemingdcat.config as sdct_config
-from ckanext.schemingdcat.utils import get_facets_dict
+from ckanext.schemingdcat.utils import get_facets_dict, reset_facets_dict
 import logging
+from threading import Lock
 
 log = logging.getLogger(__name__)
 
@@ -11,9 +12,15 @@ class Faceted():
 
     plugins.implements(plugins.IFacets)
     facet_list = []
+    # Facet labels index by (locale, package_type)
+    _facet_labels = {}
+    _facet_labels_lock = Lock()
 
     def facet_load_config(self, facet_list):
         self.facet_list = facet_list
+        # The schemas may have been reloaded along with the configuration
+        self._facet_labels = {}
+        reset_facets_dict()
         #log.debug("Configured facet_list= {0}".format(self.facet_list))
 
     # Remove group facet
@@ -32,37 +39,79 @@ class Faceted():
         else:
             return facets_dict
 
-    def _custom_facets(self,
-                       facets_dict,
-                       package_type):
-
-        lang_code = request.environ['CKAN_LANG']
-
-        _facets_dict = {}
+    def _get_facet_labels(self,
+                          lang_code,
+                          package_type):
+        """Get the facet labels index for a locale and package type.
+
+        The labels are resolved from the scheming file once per (locale, package_type) and
+        kept until the configuration (and the schemas) are loaded again.
+
+        Args:
+            lang_code (str): The language code of the request.
+            package_type (str): The package type.
+
+        Returns:
+            dict: The label of each facet in `facet_list`, or None for the facets that are
+                not in the scheming file.
+        """
+        key = (lang_code, package_type)
+        facet_labels = self._facet_labels.get(key)
+        if facet_labels is None:
+            with self._facet_labels_lock:
+                facet_labels = self._facet_labels.get(key)
+                if facet_labels is None:
+                    facet_labels = self._build_facet_labels(lang_code)
+                    self._facet_labels[key] = facet_labels
+
+        return facet_labels
+
+    def _build_facet_labels(self, lang_code):
+        scheming_facets = get_facets_dict()
+
+        facet_labels = {}
         for facet in self.facet_list:
             # Look for the field label in the scheming file.
             # If it's not there, use the default dictionary provided
-            scheming_item = get_facets_dict().get(facet)
+            scheming_item = scheming_facets.get(facet)
+
+            if not scheming_item:
+                facet_labels[facet] = None
+                continue
 
-            if scheming_item:
+            if isinstance(scheming_item, str):
+                label = plugins.toolkit._(scheming_item)
+            else:
                 # Retrieve the corresponding label for the used language
-                _facets_dict[facet] = scheming_item.get(lang_code)
-                if not _facets_dict[facet]:
+                label = scheming_item.get(lang_code)
+                if not label:
                     # If the label doesn't exist, try the default language label.
                     # And if that doesn't exist either, use the first one available.
                     raw_label = scheming_item.get(sdct_config.default_locale,
                                                   list(scheming_item.values())[0])
                     if raw_label:
-                        _facets_dict[facet] = plugins.toolkit._(raw_label)
+                        label = plugins.toolkit._(raw_label)
                     else:
                         log.warning(
                             "Unable to find a valid label for the field '%s' when faceting" % facet)
 
-                if not _facets_dict[facet]:
-                    _facets_dict[facet] = plugins.toolkit._(facet)
+            facet_labels[facet] = label or plugins.toolkit._(facet)
 
-            else:
-                _facets_dict[facet] = plugins.toolkit._(facets_dict.get(facet))
+        return facet_labels
+
+    def _custom_facets(self,
+                       facets_dict,
+                       package_type):
+
+        lang_code = request.environ['CKAN_LANG']
+        facet_labels = self._get_facet_labels(lang_code, package_type)
+
+        _facets_dict = {}
+        for facet in self.facet_list:
+            label = facet_labels.get(facet)
+            if label is None:
+                label = plugins.toolkit._(facets_dict.get(facet))
+            _facets_dict[facet] = label
 
         # tag_key = 'tags_' + lang_code
         # facets_dict[tag_key] = plugins.toolkit._('Tag')
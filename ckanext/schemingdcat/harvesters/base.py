@@ -13,8 +13,6 @@ import csv
 import urllib.request
 from urllib.parse import urlparse
 from urllib.error import URLError, HTTPError
-import mimetypes
-import requests
 
 import ckan.logic as logic
 from ckan.model import Session
@@ -28,6 +26,16 @@ from ckanext.harvest.harvesters import HarvesterBase
 from ckanext.harvest.logic.schema import unicode_safe
 from ckanext.harvest.model import HarvestObject, HarvestObjectExtra
 from ckanext.schemingdcat.lib.field_mapping import FieldMappingValidator
+from ckanext.schemingdcat.lib.serialization import HarvestContentSerializer
+from ckanext.schemingdcat.lib.format_matcher import format_matcher
+from ckanext.schemingdcat.lib.format_resolver import (
+    FormatResolver,
+    infer_format_from_url,
+    DEFAULT_TIMEOUT as FORMAT_INFERENCE_TIMEOUT,
+    DEFAULT_MAX_WORKERS as FORMAT_INFERENCE_WORKERS,
+    DEFAULT_MAX_PER_HOST as FORMAT_INFERENCE_PER_HOST,
+    DEFAULT_CACHE_TTL as FORMAT_INFERENCE_CACHE_TTL,
+)
 
 from ckanext.schemingdcat.config import (
     DATASET_DEFAULT_SCHEMA,
@@ -38,7 +46,6 @@ from ckanext.schemingdcat.config import (
     DATE_FIELDS,
     DATASET_DEFAULT_FIELDS,
     RESOURCE_DEFAULT_FIELDS,
-    CUSTOM_FORMAT_RULES,
     DATADICTIONARY_DEFAULT_SCHEMA,
     URL_REGEX,
     INVALID_CHARS,
@@ -218,7 +225,7 @@ class SchemingDCATHarvester(HarvesterBase):
                 except logic.NotFound:
                     raise ValueError("User not found")
 
-            for key in ("read_only", "force_all", "override_local_datasets"):
+            for key in ("read_only", "force_all", "override_local_datasets", "compress_content"):
                 if key in config_obj:
                     if not isinstance(config_obj[key], bool):
                         raise ValueError("%s must be boolean" % key)
@@ -324,6 +331,73 @@ class SchemingDCATHarvester(HarvesterBase):
                 return extra.value
         return None
 
+    def _get_content_serializer(self):
+        """
+        Returns the serializer for the harvest object content.
+
+        The JSON backend is set with `schemingdcat.harvest.json_backend` (auto, orjson, msgspec or json) and
+        the compression with the source config option `compress_content`, which defaults to
+        `schemingdcat.harvest.compress_content`.
+
+        Returns:
+            HarvestContentSerializer: The serializer for the current harvest source.
+        """
+        compress = p.toolkit.asbool(config.get("schemingdcat.harvest.compress_content", False))
+        if self.config:
+            compress = p.toolkit.asbool(self.config.get("compress_content", compress))
+
+        return HarvestContentSerializer(
+            backend=config.get("schemingdcat.harvest.json_backend", "auto"),
+            compress=compress,
+        )
+
+    def _get_format_resolver(self):
+        """
+        Returns the resolver used to infer the format of the distributions from their URL.
+
+        The resolver is configured with `schemingdcat.harvest.format_inference_timeout`,
+        `schemingdcat.harvest.format_inference_workers`, `schemingdcat.harvest.format_inference_per_host`
+        and `schemingdcat.harvest.format_inference_cache_ttl`.
+
+        Returns:
+            FormatResolver: The format resolver.
+        """
+        if getattr(self, '_format_resolver', None) is None:
+            self._format_resolver = FormatResolver(
+                timeout=float(config.get("schemingdcat.harvest.format_inference_timeout", FORMAT_INFERENCE_TIMEOUT)),
+                max_workers=p.toolkit.asint(config.get("schemingdcat.harvest.format_inference_workers", FORMAT_INFERENCE_WORKERS)),
+                max_per_host=p.toolkit.asint(config.get("schemingdcat.harvest.format_inference_per_host", FORMAT_INFERENCE_PER_HOST)),
+                cache_ttl=p.toolkit.asint(config.get("schemingdcat.harvest.format_inference_cache_ttl", FORMAT_INFERENCE_CACHE_TTL)),
+            )
+        return self._format_resolver
+
+    def _dump_harvest_content(self, content):
+        """
+        Serializes a dict to be stored in HarvestObject.content.
+
+        Args:
+            content (dict): The dataset dict.
+
+        Returns:
+            str: The serialized content.
+        """
+        return self._get_content_serializer().dumps(content)
+
+    def _load_harvest_content(self, harvest_object):
+        """
+        Deserializes the content of a harvest object, compressed or not.
+
+        Args:
+            harvest_object (HarvestObject): The harvest object.
+
+        Returns:
+            dict: The dataset dict.
+
+        Raises:
+            ValueError: If the content cannot be parsed.
+        """
+        return self._get_content_serializer().loads(harvest_object.content)
+
     def _get_dict_value(self, _dict, key, default=None):
         """
         Returns the value for the given key on a CKAN dict
@@ -1236,6 +1310,8 @@ class SchemingDCATHarvester(HarvesterBase):
         header is not found or an exception occurs, it falls back to guessing the
         format and encoding based on the URL's extension.
 
+        The harvest stages use the cached and concurrent `_get_format_resolver` instead.
+
         Args:
             url (str): The URL of the file.
 
@@ -1248,23 +1324,7 @@ class SchemingDCATHarvester(HarvesterBase):
         if url is None or url == "":
             return None, None, None
 
-        try:
-            response = requests.head(url, allow_redirects=True)
-            content_type = response.headers.get('content-type')
-            if content_type:
-                mimetype, *encoding = content_type.split(';')
-                format = mimetype.split('/')[-1]
-                encoding = encoding[0].split('charset=')[-1] if encoding and 'charset=' in encoding[0] else OGC2CKAN_HARVESTER_MD_CONFIG["encoding"]
-            else:
-                raise Exception("Content-Type header not found")
-        except Exception:
-            mimetype, encoding = mimetypes.guess_type(url)
-            format = mimetype.split('/')[-1].upper() if mimetype else url.rsplit('.', 1)[-1]
-            encoding = encoding or OGC2CKAN_HARVESTER_MD_CONFIG["encoding"]
-
-        mimetype = f"{mimetype_base_uri}/{mimetype}" if mimetype else None
-
-        return format, mimetype, encoding
+        return infer_format_from_url(url)[:3]
 
     @staticmethod
     def _normalize_date(date, source_date_format=None):
@@ -1482,6 +1542,8 @@ class SchemingDCATHarvester(HarvesterBase):
 
         # Resources defaults
         if package_dict["resources"]:
+            # Resolve the formats of all the distributions without a known format at once
+            self._resolve_unknown_formats(package_dict["resources"])
             package_dict["resources"] = [
                 self._update_resource_dict(resource)
                 for resource in package_dict["resources"]
@@ -1637,9 +1699,9 @@ class SchemingDCATHarvester(HarvesterBase):
     def _update_custom_format(res_format, mimetype=None, url=None, **args):
       """Update of the custom format based on custom rules.
 
-      This optimized version pre-processes the rules to lower case outside the main loop to enhance efficiency.
-      It checks the format and URL against a set of custom rules (CUSTOM_FORMAT_RULES). If a rule matches,
-      the format is updated accordingly. This function is designed for easy extension with new rules.
+      It checks the format and URL against a set of custom rules (CUSTOM_FORMAT_RULES), compiled once by
+      `lib.format_matcher`. If a rule matches, the format is updated accordingly. This function is designed
+      for easy extension with new rules.
 
       Args:
         res_format (str): The custom format to update.
@@ -1653,26 +1715,7 @@ class SchemingDCATHarvester(HarvesterBase):
       if not res_format:
           return ("", None)  # Return a default tuple if format is None or empty
 
-      res_format_lower = res_format.lower()
-      url_lower = url.lower() if url is not None else ""
-
-      preprocessed_rules = [
-          {
-              "format_strings_lower": [s.lower() for s in rule["format_strings"]] if rule["format_strings"] is not None else None,
-              "url_string_lower": rule["url_string"].lower() if rule["url_string"] is not None else None,
-              "format": rule["format"].upper(),
-              "mimetype": rule['mimetype'].strip()
-          }
-          for rule in CUSTOM_FORMAT_RULES
-      ]
-
-      for rule in preprocessed_rules:
-          if rule["format_strings_lower"] and any(s in res_format_lower for s in rule["format_strings_lower"]):
-              return rule["format"], rule['mimetype']
-          elif rule["url_string_lower"] and rule["url_string_lower"] in url_lower:
-              return rule["format"], rule['mimetype']
-
-      return res_format, mimetype  # Ensure a tuple is returned
+      return format_matcher.match_custom_format(res_format, url) or (res_format, mimetype)
 
     @staticmethod
     def _secret_properties(input_dict, secrets=None):
@@ -1693,18 +1736,39 @@ class SchemingDCATHarvester(HarvesterBase):
         # Use dictionary comprehension to create a copy and obfuscate in one step
         return {key: (default_secret_value if key in secrets else value) for key, value in input_dict.items()}
 
-    def _get_ckan_format(self, resource):
-        """Get the CKAN format information for a distribution.
+    def _resolve_unknown_formats(self, resources):
+        """Infer concurrently the formats of the distributions without a known format from their URLs.
+
+        The results are cached by URL, so `_get_ckan_format` reads them from the cache.
 
         Args:
-            resource (dict): A dictionary containing information about the distribution.
+            resources (list): The distributions of a dataset.
 
         Returns:
-            dict: The updated distribution information.
+            dict: The (format, mimetype, encoding) of each resolved URL.
         """
+        urls = [
+            resource.get('url') for resource in resources
+            if isinstance(resource, dict) and not self._get_known_format(resource)[0]
+        ]
+        if not urls:
+            return {}
 
-        encoding = "UTF-8"
+        try:
+            return self._get_format_resolver().resolve_many(urls)
+        except Exception as e:
+            log.warning('Unable to resolve the formats of the distributions: %s', e)
+            return {}
+
+    def _get_known_format(self, resource):
+        """Get the format of a distribution from its metadata, without remote requests.
+
+        Args:
+            resource (dict): A dictionary containing information about the distribution.
 
+        Returns:
+            tuple: The format (None or empty if unknown) and mimetype.
+        """
         informat = resource.get("format", "").lower() if isinstance(resource.get("format"), str) else None
 
         if informat is None:
@@ -1713,15 +1777,26 @@ class SchemingDCATHarvester(HarvesterBase):
                 for key, value in resource.items()
                 if key in ["title", "url", "description"] and isinstance(value, str)
             ).lower()
-            informat = next(
-                (key for key in OGC2CKAN_MD_FORMATS if key.lower() in informat),
-                None,
-            )
+            informat = format_matcher.match_md_format(informat)
+
+        return (informat, OGC2CKAN_MD_FORMATS[informat][1]) if informat in OGC2CKAN_MD_FORMATS else (informat, None)
+
+    def _get_ckan_format(self, resource):
+        """Get the CKAN format information for a distribution.
+
+        Args:
+            resource (dict): A dictionary containing information about the distribution.
+
+        Returns:
+            dict: The updated distribution information.
+        """
+
+        encoding = "UTF-8"
 
-        format, mimetype = (informat, OGC2CKAN_MD_FORMATS[informat][1]) if informat in OGC2CKAN_MD_FORMATS else (informat, None)
+        format, mimetype = self._get_known_format(resource)
 
         if format is None or format == "":
-            format, mimetype, encoding = self._infer_format_from_url(resource.get('url'))
+            format, mimetype, encoding = self._get_format_resolver().resolve(resource.get('url'))
 
         format, mimetype = self._update_custom_format(format, mimetype, resource.get("url", "")) if format else ("", None)
 
@@ -343,7 +343,7 @@ class SchemingDCATCKANHarvester(SchemingDCATHarvester):
                 package_ids.add(pkg_dict["id"])
 
                 obj = HarvestObject(
-                    guid=pkg_dict["id"], job=harvest_job, content=json.dumps(pkg_dict)
+                    guid=pkg_dict["id"], job=harvest_job, content=self._dump_harvest_content(pkg_dict)
                 )
                 obj.save()
                 object_ids.append(obj.id)
@@ -497,7 +497,7 @@ class SchemingDCATCKANHarvester(SchemingDCATHarvester):
         self._set_config(harvest_object.job.source.config)
 
         try:
-            package_dict = json.loads(harvest_object.content)
+            package_dict = self._load_harvest_content(harvest_object)
             
             # Add default values: tags, groups, etc.
             package_dict = self._set_package_dict_default_values(
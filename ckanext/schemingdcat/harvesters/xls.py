@@ -5,14 +5,20 @@ import logging
 import re
 import uuid
 import base64
+import hashlib
 import traceback
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from threading import Lock
 import six
 import dateutil
+import requests
 
 import gspread
+from gspread.utils import absolute_range_name, extract_id_from_url
 import pandas as pd
 
 from ckan.logic import NotFound, get_action
+from ckan.model.system_info import get_system_info, set_system_info
 from ckan import logic
 import ckan.plugins as p
 import ckan.model as model
@@ -21,6 +27,7 @@ from ckanext.harvest.model import HarvestObject, HarvestObjectExtra
 from ckanext.schemingdcat.harvesters.base import SchemingDCATHarvester, RemoteResourceError, ReadError, RemoteSchemaError
 from ckanext.schemingdcat.interfaces import ISchemingDCATHarvester
 from ckanext.schemingdcat.lib.field_mapping import FieldMappingValidator
+from ckanext.schemingdcat.lib.serialization import fingerprint
 
 from ckanext.schemingdcat.config import (
     COMMON_DATE_FORMATS
@@ -62,7 +69,20 @@ class SchemingDCATXLSHarvester(SchemingDCATHarvester):
     _storage_type = None
     _auth = False
     _credentials = None
-    _names_taken = []
+    _names_taken = set()
+    # Authenticated gspread clients by credentials, shared by all the harvest jobs of the process
+    _gspread_clients = {}
+    _gspread_clients_lock = Lock()
+    # Number of rows of the datasets sheet converted to dicts at a time when the gather stage creates
+    # the harvest objects incrementally. The remote sheets are still read whole into DataFrames.
+    _gather_chunksize = 1000
+    # Timeout (seconds) of the request for the remote file validators (ETag, Last-Modified, modifiedTime)
+    _remote_state_timeout = 30
+    # Seconds the gather stage waits for the validators before reading the remote file anyway
+    _remote_state_wait = 10
+    _remote_state_keys = ('etag', 'last_modified', 'modified_time')
+    # The validators are requested in the background, while the remote file is read
+    _remote_state_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='schemingdcat-xls-state')
 
     def _set_config_credentials(self, storage_type, config_obj):
         """
@@ -231,10 +251,7 @@ class SchemingDCATXLSHarvester(SchemingDCATHarvester):
             elif storage_type in ['gspread', 'gdrive']:
                 if self._auth and self._credentials:
                     try:
-                        gc = gspread.service_account_from_dict(self._credentials)
-                        sh = gc.open_by_url(url)
-                        worksheet = sh.worksheet(sheet_name)
-                        data = pd.DataFrame(worksheet.get_all_records(), dtype=str)
+                        data = self._read_remote_gspread_sheets(url, [sheet_name])[sheet_name]
                     except gspread.exceptions.APIError as e:
                         msg_error = f'Error reading sheet {sheet_name} using URL {url}. Error: {str(e)}. If the file is an XLS file, it needs to be converted to a Google Sheet.'
                         self._save_gather_error(msg_error, harvest_job)
@@ -254,15 +271,245 @@ class SchemingDCATXLSHarvester(SchemingDCATHarvester):
         except Exception as e:
             raise ReadError(f'Error reading sheet {sheet_name} using URL {url}. Error: {str(e)}')
 
-    def _clean_table_datasets(self, data):
+    def _get_gspread_client(self, credentials):
+        """
+        Get an authenticated gspread client for the given credentials.
+
+        Clients are cached by credentials, so the access token is reused (and refreshed when
+        it expires) between sheets and harvest jobs. Requests rejected by the API quota are
+        retried with exponential backoff.
+
+        Args:
+            credentials (dict): The service account credentials.
+
+        Returns:
+            gspread.Client: The authenticated client.
+        """
+        key = hashlib.sha256(json.dumps(credentials, sort_keys=True).encode('utf-8')).hexdigest()
+        client = self._gspread_clients.get(key)
+        if client is None:
+            with self._gspread_clients_lock:
+                client = self._gspread_clients.get(key)
+                if client is None:
+                    client = gspread.service_account_from_dict(credentials, http_client=gspread.BackOffHTTPClient)
+                    self._gspread_clients[key] = client
+
+        return client
+
+    @staticmethod
+    def _values_to_dataframe(values):
+        """
+        Build a DataFrame from the values of a sheet, using the first row as column names.
+
+        Args:
+            values (list): The rows of the sheet as lists of strings.
+
+        Returns:
+            pandas.DataFrame: The sheet data.
+        """
+        if not values:
+            return pd.DataFrame(dtype=str)
+
+        header = values[0]
+        n_cols = len(header)
+        # The API omits the trailing empty cells of each row
+        rows = [row[:n_cols] if len(row) >= n_cols else row + [''] * (n_cols - len(row)) for row in values[1:]]
+        return pd.DataFrame(rows, columns=header, dtype=str)
+
+    def _read_remote_gspread_sheets(self, url, sheet_names):
+        """
+        Read several sheets of a Google Sheet with a single batch request.
+
+        Args:
+            url (str): The URL of the Google Sheet.
+            sheet_names (list): The names of the sheets to read.
+
+        Returns:
+            dict: The data of each sheet as a DataFrame, by sheet name.
+
+        Raises:
+            gspread.exceptions.APIError: If the request fails.
+        """
+        client = self._get_gspread_client(self._credentials)
+        response = client.http_client.values_batch_get(
+            extract_id_from_url(url),
+            [absolute_range_name(sheet_name) for sheet_name in sheet_names]
+        )
+
+        return {
+            sheet_name: self._values_to_dataframe(value_range.get('values', []))
+            for sheet_name, value_range in zip(sheet_names, response.get('valueRanges', []))
+        }
+
+    def _read_remote_sheets(self, url, sheet_names, storage_type, harvest_job=None):
+        """
+        Read several sheets of a remote table. Google Sheets are fetched with a single request.
+
+        Args:
+            url (str): The URL of the remote file.
+            sheet_names (list): The names of the sheets to read.
+            storage_type (str): The type of storage where the file is located.
+            harvest_job (HarvestJob, optional): The harvest job object. Defaults to None.
+
+        Returns:
+            dict: The data of each sheet as a DataFrame, by sheet name.
+
+        Raises:
+            ReadError: If there is an error reading the sheets.
+        """
+        if storage_type not in ['gspread', 'gdrive'] or not (self._auth and self._credentials):
+            return {sheet_name: self._read_remote_sheet(url, sheet_name, storage_type, harvest_job=harvest_job) for sheet_name in sheet_names}
+
+        try:
+            sheets = self._read_remote_gspread_sheets(url, sheet_names)
+        except gspread.exceptions.APIError as e:
+            msg_error = f'Error reading sheets {", ".join(sheet_names)} using URL {url}. Error: {str(e)}. If the file is an XLS file, it needs to be converted to a Google Sheet.'
+            self._save_gather_error(msg_error, harvest_job)
+            raise ReadError(msg_error)
+        except Exception as e:
+            raise ReadError(f'Error reading sheets {", ".join(sheet_names)} using URL {url}. Error: {str(e)}')
+
+        return {sheet_name: data.fillna('') for sheet_name, data in sheets.items()}
+
+    def _get_remote_file_state(self, url):
+        """
+        Get the validators of the remote file without downloading it: the Drive `modifiedTime`
+        for Google Sheets, or the `ETag`/`Last-Modified` headers for the other storages.
+
+        Args:
+            url (str): The URL of the remote file.
+
+        Returns:
+            dict: The validators available, empty if the remote server does not provide any.
+        """
+        try:
+            if self._storage_type in ['gspread', 'gdrive'] and self._auth and self._credentials:
+                metadata = self._get_gspread_client(self._credentials).http_client.get_file_drive_metadata(extract_id_from_url(url))
+                state = {'modified_time': metadata.get('modifiedTime')}
+            else:
+                response = requests.head(url, allow_redirects=True, timeout=self._remote_state_timeout)
+                response.raise_for_status()
+                state = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified')
+                }
+        except Exception as e:
+            log.debug('Unable to get the validators of the remote file %s: %s', url, e)
+            return {}
+
+        return {key: value for key, value in state.items() if value}
+
+    def _wait_remote_file_state(self, future):
+        """
+        Get the validators of the remote file requested in the background, waiting at most
+        `_remote_state_wait` seconds for them.
+
+        Args:
+            future (concurrent.futures.Future): The future of `_get_remote_file_state`.
+
+        Returns:
+            dict: The validators, empty if they were not received in time.
+        """
+        try:
+            return future.result(timeout=self._remote_state_wait)
+        except FutureTimeoutError:
+            log.debug('The validators of the remote file were not received in %s seconds', self._remote_state_wait)
+            return {}
+
+    @staticmethod
+    def _get_content_hash(content_dicts):
+        """
+        Get a hash of the content of the remote sheets.
+
+        Args:
+            content_dicts (dict): A dict of dataframes containing the content of the remote sheets.
+
+        Returns:
+            str: The SHA-256 hex digest of the sheets content.
+        """
+        content_hash = hashlib.sha256()
+        for content_type in sorted(content_dicts):
+            data = content_dicts[content_type]
+            content_hash.update(content_type.encode('utf-8'))
+            content_hash.update('\x1f'.join(map(str, data.columns)).encode('utf-8'))
+            content_hash.update(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+
+        return content_hash.hexdigest()
+
+    @staticmethod
+    def _get_source_state_key(source_id):
+        return f'schemingdcat_xls_state_{source_id}'
+
+    def _get_source_state(self, source_id):
+        """
+        Get the state of the remote file recorded by the last gather stage of a harvest source.
+
+        Args:
+            source_id (str): The harvest source id.
+
+        Returns:
+            dict: The recorded state (job_id, config_hash, content_hash and the remote file validators), empty if there is none.
+        """
+        value = get_system_info(self._get_source_state_key(source_id))
+        try:
+            return json.loads(value) if value else {}
+        except ValueError:
+            return {}
+
+    def _set_source_state(self, source_id, state):
+        """
+        Record the state of the remote file of a harvest source.
+
+        Args:
+            source_id (str): The harvest source id.
+            state (dict): The state to record.
+        """
+        set_system_info(self._get_source_state_key(source_id), json.dumps(state))
+
+    @staticmethod
+    def _is_remote_file_unchanged(previous_state, remote_state):
+        """
+        Check whether the validators of the remote file match the recorded ones.
+
+        Args:
+            previous_state (dict): The state recorded by the last gather stage.
+            remote_state (dict): The current validators of the remote file.
+
+        Returns:
+            bool: True if there are validators and all of them match, False otherwise.
+        """
+        return bool(remote_state) and all(previous_state.get(key) == value for key, value in remote_state.items())
+
+    def _delete_harvest_objects(self, object_ids):
+        """
+        Delete harvest objects created by the gather stage that must not be imported.
+
+        Args:
+            object_ids (list): The ids of the harvest objects.
+        """
+        # The session may be unusable after a database error
+        model.Session.rollback()
+        object_ids = list(object_ids)
+        for start in range(0, len(object_ids), self._gather_chunksize):
+            chunk = object_ids[start:start + self._gather_chunksize]
+            model.Session.query(HarvestObjectExtra) \
+                .filter(HarvestObjectExtra.harvest_object_id.in_(chunk)) \
+                .delete(synchronize_session=False)
+            model.Session.query(HarvestObject) \
+                .filter(HarvestObject.id.in_(chunk)) \
+                .delete(synchronize_session=False)
+        model.Session.commit()
+
+    def _clean_table_datasets(self, data, chunksize=None):
         """
         Clean the table datasets by removing leading/trailing whitespaces, newlines, and tabs.
 
         Args:
             data (pandas.DataFrame): The input table dataset.
+            chunksize (int, optional): If provided, the records are yielded lazily in chunks of this number of rows instead of returning a list. Defaults to None.
 
         Returns:
-            list: A list of dictionaries representing the cleaned table datasets.
+            list or iterator: A list (or an iterator if chunksize is provided) of dictionaries representing the cleaned table datasets.
         """
         # Clean column names by removing leading/trailing whitespaces, newlines, and tabs
         data.columns = data.columns.str.strip().str.replace('\n', '').str.replace('\t', '')
@@ -271,9 +518,27 @@ class SchemingDCATXLSHarvester(SchemingDCATHarvester):
         data = data.apply(lambda x: x.str.strip() if x.dtype == 'object' else x)
         data = data.fillna(value='')
 
+        if chunksize:
+            return self._iter_table_records(data, chunksize)
+
         # Convert table to list of dicts
         return data.to_dict('records')
 
+    @staticmethod
+    def _iter_table_records(data, chunksize):
+        """
+        Yields the rows of a DataFrame as dicts, converting only one chunk of rows at a time.
+
+        Args:
+            data (pandas.DataFrame): The input table.
+            chunksize (int): The number of rows converted to dicts at a time.
+
+        Yields:
+            dict: A row of the table.
+        """
+        for start in range(0, len(data), chunksize):
+            yield from data.iloc[start:start + chunksize].to_dict('records')
+
     def _clean_table_distributions(self, data, prefix_colnames='resource_', dataset_id_colname='dataset_id'):
         """
         Clean the table distributions data.
@@ -362,23 +627,43 @@ class SchemingDCATXLSHarvester(SchemingDCATHarvester):
             list: List of dataset objects with distributions (CKAN resources) and datadictionaries added.
         """
         try:
-            return [
-                {
-                    **d,
-                    'resources': [
-                        {**dr, 'datadictionaries': table_datadictionaries_grouped.get(dr[datadictionary_id_field], []) if table_datadictionaries_grouped else []}
-                        for dr in table_distributions_grouped.get(
-                            d.get(identifier_field) or d.get(alternate_identifier_field) or d.get(inspire_id_field), []
-                        )
-                    ]
-                }
-                for d in table_datasets
-            ]
+            return list(self._iter_datasets_with_distributions_and_datadictionaries(table_datasets, table_distributions_grouped, table_datadictionaries_grouped, identifier_field, alternate_identifier_field, inspire_id_field, datadictionary_id_field))
         except Exception as e:
             log.error("Error while adding distributions and datadictionaries to datasets: %s", str(e))
             raise
 
-    def _process_content(self, content_dicts, source_url, distribution_prefix_colnames, dataset_id_colname, datadictionary_prefix_colnames, distribution_id_colname):
+    @staticmethod
+    def _iter_datasets_with_distributions_and_datadictionaries(table_datasets, table_distributions_grouped, table_datadictionaries_grouped, identifier_field='identifier', alternate_identifier_field='alternate_identifier', inspire_id_field='inspire_id', datadictionary_id_field="id"):
+        """
+        Lazily add distributions (CKAN resources) and datadictionaries to each dataset object.
+
+        Distributions and datadictionaries are joined through the dicts grouped by dataset/resource id, so each dataset is built only when it is consumed.
+
+        Args:
+            table_datasets (iterable): Iterable of dataset objects.
+            table_distributions_grouped (dict): Dictionary of distributions grouped by dataset identifier.
+            table_datadictionaries_grouped (dict): Dictionary of datadictionaries grouped by dataset identifier.
+            identifier_field (str, optional): Field name for the identifier. Defaults to 'identifier'.
+            alternate_identifier_field (str, optional): Field name for the alternate identifier. Defaults to 'alternate_identifier'.
+            inspire_id_field (str, optional): Field name for the inspire id. Defaults to 'inspire_id'.
+            datadictionary_id_field (str, optional): Field name for the datadictionary id. Defaults to 'id'.
+
+        Yields:
+            dict: A dataset object with distributions (CKAN resources) and datadictionaries added.
+        """
+        table_distributions_grouped = table_distributions_grouped or {}
+
+        for d in table_datasets:
+            dataset_id = d.get(identifier_field) or d.get(alternate_identifier_field) or d.get(inspire_id_field)
+            yield {
+                **d,
+                'resources': [
+                    {**dr, 'datadictionaries': table_datadictionaries_grouped.get(dr[datadictionary_id_field], []) if table_datadictionaries_grouped else []}
+                    for dr in table_distributions_grouped.get(dataset_id, [])
+                ]
+            }
+
+    def _process_content(self, content_dicts, source_url, distribution_prefix_colnames, dataset_id_colname, datadictionary_prefix_colnames, distribution_id_colname, chunksize=None):
         """
         Process the content of the harvested dataset.
 
@@ -389,13 +674,14 @@ class SchemingDCATXLSHarvester(SchemingDCATHarvester):
             dataset_id_colname (str): The column name representing the dataset ID.
             datadictionary_prefix_colnames (str): The prefix used in column names that need to be removed in the datadictionaries dataframe.
             distribution_id_colname (str): The column name representing the resource ID.
+            chunksize (int, optional): If provided, the datasets are returned as an iterator that builds them in chunks of rows. Defaults to None.
 
         Returns:
-            dict: A dictionary containing the processed content of the harvested dataset.
+            list or iterator: The processed datasets of the harvested source.
         """
         log.debug('In SchemingDCATXLSHarvester process_content: %s', source_url)
 
-        table_datasets = self._clean_table_datasets(content_dicts['datasets'])
+        table_datasets = self._clean_table_datasets(content_dicts['datasets'], chunksize)
 
         if content_dicts.get('distributions') is not None and not content_dicts['distributions'].empty:
             table_distributions_grouped = self._clean_table_distributions(content_dicts['distributions'], distribution_prefix_colnames, dataset_id_colname)
@@ -408,6 +694,9 @@ class SchemingDCATXLSHarvester(SchemingDCATHarvester):
         else:
             table_datadictionaries_grouped = None
 
+        if chunksize:
+            return self._iter_datasets_with_distributions_and_datadictionaries(table_datasets, table_distributions_grouped, table_datadictionaries_grouped)
+
         return self._add_distributions_and_datadictionaries_to_datasets(table_datasets, table_distributions_grouped, table_datadictionaries_grouped)
 
     def get_package_dict(self, harvest_object, context, package_dict=None):
@@ -466,6 +755,44 @@ class SchemingDCATXLSHarvester(SchemingDCATHarvester):
         """
         return [x.strip(" -") for x in value.split(',') if x.strip()]
 
+    def _get_list_fields(self):
+        """
+        Get the local schema fields whose string values should be converted to lists.
+
+        Returns:
+            set: The field names.
+        """
+        if self._local_schema is None:
+            self._local_schema = self._get_local_schema()
+
+        return {'groups'} | {
+            field['field_name']
+            for field in self._local_schema['dataset_fields']
+            if any(keyword in field.get(field_type, '').lower() for keyword in ['list', 'multiple', 'tag_string', 'tag', 'group'] for field_type in ['validators', 'output_validators', 'preset']) or 'groups' in field['field_name'].lower()
+        }
+
+    def _update_dict_list(self, element, list_fields):
+        """
+        Update the dictionary lists of a single dataset.
+
+        Args:
+            element (dict): The dataset to be updated.
+            list_fields (set): The field names that should be converted to lists.
+
+        Returns:
+            dict: The updated dataset.
+        """
+        for key, value in element.items():
+            if key in list_fields and isinstance(value, str):
+                element[key] = self._set_string_to_list(value)
+            elif key == 'distributions':
+                for distribution in value:
+                    for key_dist, value_dist in distribution.items():
+                        if key_dist in list_fields and isinstance(value_dist, str):
+                            distribution[key_dist] = self._set_string_to_list(value_dist)
+
+        return element
+
     def _update_dict_lists(self, data):
         """
         Update the dictionary lists in the given data.
@@ -476,25 +803,11 @@ class SchemingDCATXLSHarvester(SchemingDCATHarvester):
         Returns:
             list: The updated data.
         """
-        if self._local_schema is None:
-            self._local_schema = self._get_local_schema()
-
         # Get the list of fields that should be converted to lists
-        list_fields = ['groups'] + [
-            field['field_name']
-            for field in self._local_schema['dataset_fields']
-            if any(keyword in field.get(field_type, '').lower() for keyword in ['list', 'multiple', 'tag_string', 'tag', 'group'] for field_type in ['validators', 'output_validators', 'preset']) or 'groups' in field['field_name'].lower()
-        ]
+        list_fields = self._get_list_fields()
 
         for element in data:
-            for key, value in element.items():
-                if key in list_fields and isinstance(value, str):
-                    element[key] = self._set_string_to_list(value)
-                elif key == 'distributions':
-                    for distribution in value:
-                        for key_dist, value_dist in distribution.items():
-                            if key_dist in list_fields and isinstance(value_dist, str):
-                                distribution[key_dist] = self._set_string_to_list(value_dist)
+            self._update_dict_list(element, list_fields)
 
         # Return the updated data
         return data
@@ -695,7 +1008,7 @@ class SchemingDCATXLSHarvester(SchemingDCATHarvester):
         log.debug('In SchemingDCATXLSHarvester gather_stage with harvest source: %s and remote sheet: %s', harvest_source_title, source_url)
         
         content_dicts = {}
-        self._names_taken = []
+        self._names_taken = set()
         
         # Get config options
         if harvest_job.source.config:
@@ -739,6 +1052,17 @@ class SchemingDCATXLSHarvester(SchemingDCATHarvester):
         guids_in_db = set(guid_to_package_id.keys())
         guids_in_harvest = set()
 
+        # Get the content fingerprints of the datasets successfully imported for this source
+        query = \
+            model.Session.query(HarvestObject.guid, HarvestObjectExtra.value) \
+            .join(HarvestObjectExtra, HarvestObjectExtra.harvest_object_id == HarvestObject.id) \
+            .filter(HarvestObject.current == True) \
+            .filter(HarvestObject.state == 'COMPLETE') \
+            .filter(HarvestObject.harvest_source_id == harvest_job.source.id) \
+            .filter(HarvestObjectExtra.key == 'content_hash')
+        guid_to_content_hash = dict(query)
+        guids_unchanged = set()
+
         # before_download interface
         for harvester in p.PluginImplementations(ISchemingDCATHarvester):
             if hasattr(harvester, 'before_download'):
@@ -749,22 +1073,57 @@ class SchemingDCATXLSHarvester(SchemingDCATHarvester):
                 
                 if not remote_sheet_download_url:
                     return []
-        
+
+        # Skip the remote file if it has not changed since the last error-free job with the same config
+        source_state = {
+            'job_id': harvest_job.id,
+            'config_hash': hashlib.sha256((harvest_job.source.config or '').encode('utf-8')).hexdigest()
+        }
+        previous_state = self._get_source_state(harvest_job.source.id)
+        last_error_free_job = self.last_error_free_job(harvest_job)
+        can_skip = (
+            not self.config.get('force_all', False)
+            and last_error_free_job is not None
+            and previous_state.get('job_id') == last_error_free_job.id
+            and previous_state.get('config_hash') == source_state['config_hash']
+        )
+
+        # The validators are only waited for if they can skip the download. Otherwise, they are
+        # recorded for the next job when the remote file has been read.
+        remote_state_future = self._remote_state_executor.submit(self._get_remote_file_state, remote_sheet_download_url)
+        if can_skip and any(previous_state.get(key) for key in self._remote_state_keys):
+            remote_state = self._wait_remote_file_state(remote_state_future)
+            if self._is_remote_file_unchanged(previous_state, remote_state):
+                log.info('The remote file of the harvest source "%s" has not changed since the last harvest job, skipping...', harvest_source_title)
+                self._set_source_state(harvest_job.source.id, {**previous_state, **source_state, **remote_state})
+                return []
+
         # Read sheets
         if is_valid:
             try:
+                #TODO: Implement self._load_datadictionaries() method.
+                sheetnames = {
+                    'datasets': dataset_sheetname,
+                    'distributions': distribution_sheetname,
+                    'datadictionaries': datadictionary_sheetname
+                }
+                sheetnames = {content_type: sheetname for content_type, sheetname in sheetnames.items() if sheetname}
+
                 try:
-                    content_dicts['datasets'] = self._read_remote_sheet(remote_sheet_download_url, dataset_sheetname, self._storage_type )
+                    sheets = self._read_remote_sheets(remote_sheet_download_url, list(sheetnames.values()), self._storage_type, harvest_job)
                 except RemoteResourceError as e:
                     self._save_gather_error('Error reading the remote Excel datasets sheet: {0}'.format(e), harvest_job)
                     return False
-                
-                if distribution_sheetname:
-                    content_dicts['distributions'] = self._read_remote_sheet(remote_sheet_download_url, distribution_sheetname, self._storage_type, harvest_job)
-                    
-                #TODO: Implement self._load_datadictionaries() method.
-                if datadictionary_sheetname:
-                    content_dicts['datadictionaries'] = self._read_remote_sheet(remote_sheet_download_url, datadictionary_sheetname, self._storage_type, harvest_job)
+
+                for content_type, sheetname in sheetnames.items():
+                    content_dicts[content_type] = sheets[sheetname]
+
+                source_state['content_hash'] = self._get_content_hash(content_dicts)
+                if can_skip and previous_state.get('content_hash') == source_state['content_hash']:
+                    log.info('The content of the remote file of the harvest source "%s" has not changed since the last harvest job, skipping...', harvest_source_title)
+                    source_state.update(self._wait_remote_file_state(remote_state_future))
+                    self._set_source_state(harvest_job.source.id, source_state)
+                    return []
 
                 # after_download interface
                 for harvester in p.PluginImplementations(ISchemingDCATHarvester):
@@ -812,30 +1171,45 @@ class SchemingDCATXLSHarvester(SchemingDCATHarvester):
                 for error_msg in before_cleaning_errors:
                     self._save_gather_error(error_msg, harvest_job)
 
+        # The after_cleaning interface needs the whole list of datasets. Otherwise, the datasets are
+        # built from the sheet in chunks of rows and their harvest objects are created incrementally.
+        # The interface has a default implementation, so only the plugins that override it count.
+        after_cleaning_harvesters = [
+            harvester for harvester in p.PluginImplementations(ISchemingDCATHarvester)
+            if getattr(type(harvester), 'after_cleaning', ISchemingDCATHarvester.after_cleaning) is not ISchemingDCATHarvester.after_cleaning
+        ]
+        chunksize = None if after_cleaning_harvesters else self._gather_chunksize
+
         # Clean tables
         try:
-            clean_datasets = self._process_content(content_dicts, remote_xls_base_url, self.config.get("distribution_prefix_colnames"), self.config.get("dataset_id_colname"), self.config.get("datadictionary_prefix_colnames"), self.config.get("distribution_id_colname"))
+            clean_datasets = self._process_content(content_dicts, remote_xls_base_url, self.config.get("distribution_prefix_colnames"), self.config.get("dataset_id_colname"), self.config.get("datadictionary_prefix_colnames"), self.config.get("distribution_id_colname"), chunksize=chunksize)
             log.debug('"%s" remote file cleaned successfully.', self._storage_types_supported[self._storage_type]['title'])
-            clean_datasets = self._update_dict_lists(clean_datasets)
-            #log.debug('clean_datasets: %s', clean_datasets)
-            log.debug('Update dict string lists. Number of datasets imported: %s', len(clean_datasets))
+            list_fields = self._get_list_fields()
+            if chunksize:
+                clean_datasets = (self._update_dict_list(dataset, list_fields) for dataset in clean_datasets)
+            else:
+                clean_datasets = self._update_dict_lists(clean_datasets)
+                #log.debug('clean_datasets: %s', clean_datasets)
+                log.debug('Update dict string lists. Number of datasets imported: %s', len(clean_datasets))
             
         except Exception as e:
             self._save_gather_error('Error cleaning the remote table: {0}'.format(e), harvest_job)
             return []
-    
+
+        # The sheets are no longer needed, only the cleaned tables
+        content_dicts = None
+
         # after_cleaning interface
-        for harvester in p.PluginImplementations(ISchemingDCATHarvester):
-            if hasattr(harvester, 'after_cleaning'):
-                clean_datasets, after_cleaning_errors = harvester.after_cleaning(clean_datasets)
+        for harvester in after_cleaning_harvesters:
+            clean_datasets, after_cleaning_errors = harvester.after_cleaning(clean_datasets)
 
-                for error_msg in after_cleaning_errors:
-                    self._save_gather_error(error_msg, harvest_job)
+            for error_msg in after_cleaning_errors:
+                self._save_gather_error(error_msg, harvest_job)
     
-        # Add datasets to the database
+        # Add datasets to the database. Harvest object id of each guid, None if the dataset is unchanged
+        guid_to_object_id = {}
         try:
             log.debug('Adding datasets to DB')
-            datasets_to_harvest = {}
             source_dataset = model.Package.get(harvest_job.source.id)
             for dataset in clean_datasets:
 
@@ -849,7 +1223,7 @@ class SchemingDCATXLSHarvester(SchemingDCATHarvester):
                     while dataset['name'] in self._names_taken:
                         suffix = sum(name.startswith(dataset['name'] + '-') for name in self._names_taken) + 1
                         dataset['name'] = '{}-{}'.format(dataset['name'], suffix)
-                    self._names_taken.append(dataset['name'])
+                    self._names_taken.add(dataset['name'])
 
                     # If the dataset has no identifier, use the name
                     if not dataset.get('identifier'):
@@ -874,51 +1248,68 @@ class SchemingDCATXLSHarvester(SchemingDCATHarvester):
                 # if existing_dataset:
                 #     dataset['identifier'] = existing_dataset['identifier']
                 #     guids_in_db.add(dataset['identifier'])
-                    
-                guids_in_harvest.add(dataset['identifier'])
-                datasets_to_harvest[dataset['identifier']] = dataset
+
+                guid = dataset['identifier']
+                if guid in guids_in_harvest:
+                    # The last dataset with the same identifier is the one harvested
+                    log.warning('Dataset with identifier %s is duplicated in the remote table, using the last one...', guid)
+                    previous_object_id = guid_to_object_id.pop(guid, None)
+                    if previous_object_id:
+                        self._delete_harvest_objects([previous_object_id])
+                    guids_unchanged.discard(guid)
+                guids_in_harvest.add(guid)
+
+                # The fingerprint includes the source config, as the import stage depends on it
+                content_hash = fingerprint(dataset, salt=source_state['config_hash'])
+
+                # Check guids to create/update. Datasets with the same content as the last import are skipped.
+                if guid in guids_in_db:
+                    if not self.config.get('force_all', False) and guid_to_content_hash.get(guid) == content_hash:
+                        guids_unchanged.add(guid)
+                        guid_to_object_id[guid] = None
+                        continue
+                    obj = HarvestObject(guid=guid, job=harvest_job, content=self._dump_harvest_content(dataset),
+                                        package_id=guid_to_package_id[guid],
+                                        extras=[HarvestObjectExtra(key='status', value='change'),
+                                                HarvestObjectExtra(key='content_hash', value=content_hash)])
+                else:
+                    obj = HarvestObject(guid=guid, job=harvest_job, content=self._dump_harvest_content(dataset),
+                                        extras=[HarvestObjectExtra(key='status', value='new'),
+                                                HarvestObjectExtra(key='content_hash', value=content_hash)])
+                obj.save()
+                guid_to_object_id[guid] = obj.id
 
         except Exception as e:
+            # Nothing is imported if the remote table can not be read whole, so the objects
+            # already created are deleted.
+            self._delete_harvest_objects(object_id for object_id in guid_to_object_id.values() if object_id)
             self._save_gather_error('Error when processsing dataset: %r / %s' % (e, traceback.format_exc()),
                                     harvest_job)
             return []
 
-        # Check guids to create/update/delete
-        new = guids_in_harvest - guids_in_db
+        object_ids = [object_id for object_id in guid_to_object_id.values() if object_id]
+
         # Get objects/datasets to delete (ie in the DB but not in the source)
-        delete = set(guids_in_db) - set(guids_in_harvest)
-        change = guids_in_db & guids_in_harvest
+        delete = guids_in_db - guids_in_harvest
+
+        log.debug('new/change: %s, unchanged: %s and delete: %s', len(object_ids), len(guids_unchanged), len(delete))
 
-        log.debug('new: %s, delete: %s and change: %s', new, delete, change)
-            
-        ids = []
-        for guid in new:
-            obj = HarvestObject(guid=guid, job=harvest_job, content=json.dumps(datasets_to_harvest.get(guid)),
-                                extras=[HarvestObjectExtra(key='status', value='new')])
-            obj.save()
-            ids.append({'id': obj.id, 'name': datasets_to_harvest.get(guid)['name'], 'identifier': datasets_to_harvest.get(guid)['identifier']})
-        for guid in change:
-            obj = HarvestObject(guid=guid, job=harvest_job, content=json.dumps(datasets_to_harvest.get(guid)),
-                                package_id=guid_to_package_id[guid],
-                                extras=[HarvestObjectExtra(key='status', value='change')])
-            obj.save()
-            ids.append({'id': obj.id, 'name': datasets_to_harvest.get(guid)['name'], 'identifier': datasets_to_harvest.get(guid)['identifier']})
         for guid in delete:
-            obj = HarvestObject(guid=guid, job=harvest_job, content=json.dumps(datasets_to_harvest.get(guid)),
+            obj = HarvestObject(guid=guid, job=harvest_job,
                                 package_id=guid_to_package_id[guid],
                                 extras=[HarvestObjectExtra(key='status', value='delete')])
             model.Session.query(HarvestObject).\
                 filter_by(guid=guid).\
                 update({'current': False}, False)
             obj.save()
-            ids.append({'id': obj.id, 'name': datasets_to_harvest.get(guid)['name'], 'identifier': datasets_to_harvest.get(guid)['identifier']})
+            object_ids.append(obj.id)
 
-        log.debug('Number of elements in clean_datasets: %s and object_ids: %s', len(clean_datasets), len(ids))
+        log.debug('Number of elements in clean_datasets: %s and object_ids: %s', len(guids_in_harvest), len(object_ids))
 
-        # Log clean_datasets/ ids
-        #self._log_export_clean_datasets_and_ids(harvest_source_title, clean_datasets, ids)
+        source_state.update(self._wait_remote_file_state(remote_state_future))
+        self._set_source_state(harvest_job.source.id, source_state)
 
-        return [id_dict['id'] for id_dict in ids]
+        return object_ids
     
     def fetch_stage(self, harvest_object):
         # Nothing to do here - we got the package dict in the search in the gather stage
@@ -991,7 +1382,7 @@ class SchemingDCATXLSHarvester(SchemingDCATHarvester):
             return False
 
         try:
-            dataset = json.loads(harvest_object.content)
+            dataset = self._load_harvest_content(harvest_object)
         except ValueError:
             self._save_object_error('Could not ateutil.parser.parse content for object {0}'.format(harvest_object.id),
                                     harvest_object, 'Import')
@@ -10,8 +10,11 @@ import yaml
 from yaml.loader import SafeLoader
 from pathlib import Path
 from functools import lru_cache
+import heapq
+from threading import Lock
 import datetime
 import typing
+from types import MappingProxyType
 from urllib.parse import urlparse
 from urllib.error import URLError
 
@@ -20,7 +23,6 @@ from six.moves.urllib.parse import urlencode
 from ckan.lib.formatters import localised_filesize as ckan_localised_filesize
 
 from ckanext.scheming.helpers import (
-    scheming_choices_label,
     scheming_language_text,
     scheming_dataset_schemas,
     scheming_get_schema
@@ -34,19 +36,32 @@ from ckanext.harvest.utils import (
 )
 
 import ckanext.schemingdcat.config as sdct_config
+from ckanext.schemingdcat.lib.cache import TTLCache, memoize
 from ckanext.schemingdcat.utils import (
     get_facets_dict,
-    public_file_exists,
+    get_geospatial_endpoint,
+    get_link_tables,
+    find_public_file,
+    get_public_asset_index,
     public_dir_exists,
 )
-from ckanext.dcat.utils import CONTENT_TYPES, get_endpoint
 from ckanext.fluent.validators import LANG_SUFFIX
 import logging
 
 log = logging.getLogger(__name__)
 
 all_helpers = {}
+# Cached dataset lists and counts of the harvest sources
+_harvest_source_cache = TTLCache()
+
+# Icon of each choice value of the scheming fields with static choices, see _get_choice_icons()
+_choice_icons = {}
+_choice_icons_lock = Lock()
+CHOICE_ICONS_MAXSIZE = 1024
+DEFAULT_ICON = "/images/default/no_icon.svg"
 prettify_cache = {}
+# Language markers of the multilingual texts, e.g. "[#en#]Welcome[#es#]Bienvenido"
+LANG_TEXT_PATTERN = re.compile(r'\[#(.*?)#\](.*?)(?=\[#|$)', re.DOTALL)
 DEFAULT_LANG = None
 
 @lru_cache(maxsize=None)
@@ -58,6 +73,10 @@ def get_scheming_dataset_schemas():
     return scheming_dataset_schemas()
 
 
+def _helpers_cache_ttl():
+    return sdct_config.helpers_cache_ttl
+
+
 def helper(fn):
     """Collect helper functions into the ckanext.schemingdcat.all_helpers dictionary.
 
@@ -194,10 +213,14 @@ def schemingdcat_get_facet_items_dict(
         and isinstance(search_facets, dict)
         and search_facets.get(facet, {}).get("items")
     ):
+        # Values selected for the facet and labels of the choices, computed once per call
+        active_values = _get_active_facet_values(facet)
+        choices_labels = _get_choices_labels(scheming_choices) if scheming_choices else None
+
         for facet_item in search_facets.get(facet)["items"]:
-            if scheming_choices:
-                facet_item["label"] = scheming_choices_label(
-                    scheming_choices, facet_item["name"]
+            if choices_labels is not None:
+                facet_item["label"] = scheming_language_text(
+                    choices_labels.get(facet_item["name"], facet_item["name"])
                 )
             else:
                 facet_item["label"] = facet_item["display_name"]
@@ -205,22 +228,21 @@ def schemingdcat_get_facet_items_dict(
             if not len(facet_item["name"].strip()):
                 continue
 
-            params_items = (
-                request.params.items(multi=True)
-                if is_flask_request()
-                else request.params.items()
-            )
-
-            if not (facet, facet_item["name"]) in params_items:
+            if facet_item["name"] not in active_values:
                 items.append(dict(active=False, **facet_item))
             elif not exclude_active:
                 items.append(dict(active=True, **facet_item))
 
-            #    log.debug("params: {0}:{1}".format(
-            #    facet,request.params.getlist("_%s_sort" % facet)))
-            order_lst = request.params.getlist("_%s_sort" % facet)
-            if len(order_lst):
-                order = order_lst[0]
+        #    log.debug("params: {0}:{1}".format(
+        #    facet,request.params.getlist("_%s_sort" % facet)))
+        order_lst = request.params.getlist("_%s_sort" % facet)
+        if len(order_lst):
+            order = order_lst[0]
+
+        if hasattr(c, "search_facets_limits"):
+            if c.search_facets_limits and limit is None:
+                limit = c.search_facets_limits.get(facet)
+
         #     Sort descendingly by count and ascendingly by case-sensitive display name
         #    items.sort(key=lambda it: (-it['count'], it['display_name'].lower()))
         sorts = {
@@ -230,22 +252,54 @@ def schemingdcat_get_facet_items_dict(
             "count_r": ("count", True),
         }
         if sorts.get(order):
-            items.sort(
-                key=lambda it: (it[sorts.get(order)[0]]), reverse=sorts.get(order)[1]
-            )
+            sort_field, reverse = sorts.get(order)
+            sort_key = lambda it: it[sort_field]
         else:
-            items.sort(key=lambda it: (-it["count"], it["label"].lower()))
+            reverse = False
+            sort_key = lambda it: (-it["count"], it["label"].lower())
 
-        if hasattr(c, "search_facets_limits"):
-            if c.search_facets_limits and limit is None:
-                limit = c.search_facets_limits.get(facet)
         # zero treated as infinite for hysterical raisins
         if limit is not None and limit > 0:
-            return items[:limit]
+            # Partial sort of the top items, same result as sorting and slicing
+            if reverse:
+                return heapq.nlargest(limit, items, key=sort_key)
+            return heapq.nsmallest(limit, items, key=sort_key)
+
+        items.sort(key=sort_key, reverse=reverse)
 
     return items
 
 
+def _get_active_facet_values(facet):
+    """Return the values selected in the request parameters for the given facet.
+
+    Args:
+        facet (str): The name of the facet.
+
+    Returns:
+        set: The selected values.
+    """
+    if is_flask_request():
+        return set(request.params.getlist(facet))
+    return set(value for key, value in request.params.items() if key == facet)
+
+
+def _get_choices_labels(scheming_choices):
+    """Return a dict of the scheming choices labels by value.
+
+    Args:
+        scheming_choices (list): The scheming choices of a field.
+
+    Returns:
+        dict: The label of each choice value.
+    """
+    choices_labels = {}
+    for choice in scheming_choices:
+        # Keep the first choice of each value, as scheming_choices_label does
+        choices_labels.setdefault(choice["value"], choice.get("label", choice["value"]))
+    return choices_labels
+
+
 @helper
 def schemingdcat_new_order_url(facet_name, order_concept, extras=None):
     """Return a URL with the order parameter for the given facet and concept to use.
@@ -430,6 +484,7 @@ def schemingdcat_get_metadata_templates_search_identifier():
     return sdct_config.metadata_templates_search_identifier
 
 @helper
+@memoize("dataset", ttl=_helpers_cache_ttl)
 def schemingdcat_get_schemingdcat_xls_harvest_templates(search_identifier=sdct_config.metadata_templates_search_identifier, count=10):
     """
     This helper function retrieves the schemingdcat_xls templates from the CKAN instance. 
@@ -460,7 +515,7 @@ def schemingdcat_get_schemingdcat_xls_harvest_templates(search_identifier=sdct_c
 
 @helper
 def schemingdcat_get_icon(
-    choice=None, icons_dir=None, default="/images/default/no_icon.svg", choice_value=None
+    choice=None, icons_dir=None, default=DEFAULT_ICON, choice_value=None
 ):
     """Return the relative URL to the icon for the item.
 
@@ -492,12 +547,76 @@ def schemingdcat_get_icon(
 
         url_path = (icons_dir + "/" if icons_dir else "") + icon_name
 
-        for extension in extensions:
-            if public_file_exists(url_path + extension):
-                return url_path + extension
+        icon_path = find_public_file(url_path, extensions)
+        if icon_path:
+            return icon_path
 
     return default
 
+def _get_choice_icons(field):
+    """Get the icon of each choice value of a scheming field with static choices.
+
+    The table is built once per field of the loaded schemas, and is built again when the
+    schemas are reloaded (their choices are new lists) or the public directories change.
+
+    Args:
+        field (dict): The scheming field definition.
+
+    Returns:
+        dict: The icon path (or None) of each choice value, or None if the field has no static choices.
+    """
+    choices = field.get("choices")
+    if not choices:
+        return None
+
+    key = (field.get("field_name"), field.get("icons_dir"), id(choices))
+    version = get_public_asset_index().version
+    entry = _choice_icons.get(key)
+    # The entry keeps a reference to the choices, so their id is not reused while it exists
+    if entry and entry[0] is choices and entry[1] == version:
+        return entry[2]
+
+    icons_dir = schemingdcat_get_icons_dir(field)
+    icons = {}
+    for choice in choices:
+        if isinstance(choice, dict):
+            icons.setdefault(choice.get("value"), schemingdcat_get_icon(choice, icons_dir, None))
+
+    with _choice_icons_lock:
+        if len(_choice_icons) >= CHOICE_ICONS_MAXSIZE:
+            _choice_icons.clear()
+        _choice_icons[key] = (choices, version, icons)
+
+    return icons
+
+@helper
+def schemingdcat_get_choice_icon(field, value, default=DEFAULT_ICON):
+    """Return the relative URL to the icon of a choice value of a scheming field.
+
+    It is equivalent to `schemingdcat_get_icon(schemingdcat_get_choice_item(field, value), schemingdcat_get_icons_dir(field), default)`,
+    but the icons of the static choices of each field are resolved once and kept in a table.
+
+    Args:
+        field (dict): The scheming field definition.
+        value (str): The choice value.
+        default (str, optional): The default value to return if no icon is found.
+
+    Returns:
+        str: The relative URL to the icon, or the default value if not found.
+    """
+    if not field:
+        return default
+
+    icons = _get_choice_icons(field)
+    if icons is None:
+        return default
+
+    try:
+        return icons.get(value) or default
+    except TypeError:
+        # Unhashable values, e.g. lists, are not choice values
+        return default
+
 @helper
 def schemingdcat_get_choice_item(field, value):
     """Return the whole choice item for the given value in the scheming field.
@@ -689,35 +808,18 @@ def schemingdcat_load_yaml(file, folder="codelists"):
 def schemingdcat_get_linked_data(id):
     """Get linked data for a given identifier.
 
+    The entries are compiled from the codelists at startup (see `utils.compile_link_tables`), only the identifier is added here.
+
     Args:
         id (str): The identifier to get linked data for.
 
     Returns:
         list: A list of dictionaries containing linked data for the identifier.
     """
+    linkeddata_table = get_link_tables()[0]
     return [
-        {
-            "name": name,
-            "display_name": sdct_config.linkeddata_links.get(name, {"display_name": content_type})[
-                "display_name"
-            ],
-            "format": sdct_config.linkeddata_links.get(name, {}).get("format"),
-            "image_display_url": sdct_config.linkeddata_links.get(name, {}).get(
-                "image_display_url"
-            ),
-            "endpoint_icon": sdct_config.linkeddata_links.get(name, {}).get(
-                "endpoint_icon"
-            ),
-            "description": sdct_config.linkeddata_links.get(name, {}).get("description")
-            or f"Formats {content_type}",
-            "description_url": sdct_config.linkeddata_links.get(name, {}).get("description_url"),
-            "endpoint": "dcat.read_dataset",
-            "endpoint_data": {
-                "_id": id,
-                "_format": name,
-            },
-        }
-        for name, content_type in CONTENT_TYPES.items()
+        dict(item, endpoint_data={"_id": id, "_format": item["name"]})
+        for item in linkeddata_table
     ]
 
 @helper
@@ -727,32 +829,10 @@ def schemingdcat_get_catalog_endpoints():
     Returns:
         list: A list of dictionaries containing linked data for the identifier.
     """    
-    csw_uri = schemingdcat_get_geospatial_endpoint("catalog")
-
+    catalog_endpoints_table = get_link_tables()[2]
     return [
-        {
-            "name": item["name"],
-            "display_name": item["display_name"],
-            "format": item["format"],
-            "image_display_url": item["image_display_url"],
-            "endpoint_icon": item["endpoint_icon"],
-            "fa_icon": item["fa_icon"],
-            "description": item["description"],
-            "type": item["type"],
-            "profile": item["profile"],
-            "profile_label": item["profile_label"],
-            "endpoint": get_endpoint("catalog")
-            if item.get("type").lower() == "lod"
-            else csw_uri.format(version=item["version"])
-            if item.get("type").lower() == "ogc"
-            else None,
-            "endpoint_data": {
-                "_format": item["format"],
-                "_external": True,
-                "profiles": item["profile"],
-            },
-        }
-        for item in sdct_config.endpoints["catalog_endpoints"]
+        dict(item, endpoint_data=dict(item["endpoint_data"]))
+        for item in catalog_endpoints_table
     ]
 
 @helper
@@ -765,29 +845,7 @@ def schemingdcat_get_geospatial_endpoint(type="dataset"):
     Returns:
         str: The base URI of the CSW Endpoint with the appropriate format.
     """
-    try:
-        if sdct_config.geometadata_base_uri:
-            csw_uri = sdct_config.geometadata_base_uri
-
-        if (
-            sdct_config.geometadata_base_uri
-            and "/csw" not in sdct_config.geometadata_base_uri
-        ):
-            csw_uri = sdct_config.geometadata_base_uri.rstrip("/") + "/csw"
-        elif sdct_config.geometadata_base_uri == "":
-            csw_uri = "/csw"
-        else:
-            csw_uri = sdct_config.geometadata_base_uri.rstrip("/")
-    except:
-        csw_uri = "/csw"
-
-    if type == "catalog":
-        return csw_uri + "?service=CSW&version={version}&request=GetCapabilities"
-    else:
-        return (
-            csw_uri
-            + "?service=CSW&version={version}&request=GetRecordById&id={id}&elementSetName={element_set_name}&outputSchema={output_schema}&OutputFormat={output_format}"
-        )
+    return get_geospatial_endpoint(type)
 
 @helper
 def schemingdcat_get_geospatial_metadata():
@@ -796,27 +854,8 @@ def schemingdcat_get_geospatial_metadata():
     Returns:
         list: A list of dictionaries containing geospatial metadata for CSW formats.
     """
-    csw_uri = schemingdcat_get_geospatial_endpoint("dataset")
-
-    return [
-        {
-            "name": item["name"],
-            "display_name": item["display_name"],
-            "format": item["format"],
-            "image_display_url": item["image_display_url"],
-            "endpoint_icon": item["endpoint_icon"],
-            "description": item["description"],
-            "description_url": item["description_url"],
-            "url": csw_uri.format(
-                output_format=item["output_format"],
-                version=item["version"],
-                element_set_name=item["element_set_name"],
-                output_schema=item["output_schema"],
-                id="{id}",
-            ),
-        }
-        for item in sdct_config.geometadata_links["csw_formats"]
-    ]
+    geometadata_table = get_link_tables()[1]
+    return [dict(item) for item in geometadata_table]
 
 @helper
 def schemingdcat_get_all_metadata(id):
@@ -828,16 +867,14 @@ def schemingdcat_get_all_metadata(id):
     Returns:
         list: A list of dictionaries containing linked data and geospatial metadata for the identifier.
     """
-    geospatial_metadata = schemingdcat_get_geospatial_metadata()
-    linked_data = schemingdcat_get_linked_data(id)
-
-    for metadata in geospatial_metadata:
-        metadata["endpoint_type"] = "csw"
-
-    for data in linked_data:
-        data["endpoint_type"] = "dcat"
+    linkeddata_table, geometadata_table, _ = get_link_tables()
 
-    return geospatial_metadata + linked_data
+    return [
+        dict(item, endpoint_type="csw") for item in geometadata_table
+    ] + [
+        dict(item, endpoint_type="dcat", endpoint_data={"_id": id, "_format": item["name"]})
+        for item in linkeddata_table
+    ]
 
 @helper
 def fluent_form_languages(field=None, entity_type=None, object_type=None, schema=None):
@@ -933,57 +970,74 @@ def schemingdcat_get_current_lang():
     except TypeError:
         return p.toolkit.config.get("ckan.locale_default", "en")
 
-@helper
-def schemingdcat_extract_lang_text(text, current_lang):
+@lru_cache(maxsize=1024)
+def parse_lang_text(text):
     """
-    Extracts the text content for a specified language from a string.
+    Splits a multilingual text into its content by language. The results are cached by text.
 
     Args:
-        text (str): The string to extract the language content from.
+        text (str): The multilingual text.
             Example: "[#en#]Welcome to the CKAN Open Data Portal.[#es#]Bienvenido al portal de datos abiertos CKAN."
-        current_lang (str): The language code to extract the content for.
-            Example: "es"
 
     Returns:
-        str: The extracted language content, or the original string if no content is found.
-            Example: "Bienvenido al portal de datos abiertos CKAN."
-
+        MappingProxyType: The stripped content of each language, the first one if a language is repeated.
+            Example: {"en": "Welcome to the CKAN Open Data Portal.", "es": "Bienvenido al portal de datos abiertos CKAN."}
     """
+    contents = {}
+    for lang, content in LANG_TEXT_PATTERN.findall(text):
+        contents.setdefault(lang, content.strip())
+    return MappingProxyType(contents)
 
-    @lru_cache(maxsize=30)
-    def process_language_content(language_label, text):
-        """Helper function to process the content for a specific language label.
-
-        Args:
-            language_label (str): The language label to process.
-            text (str): The text to process.
+@lru_cache(maxsize=1024)
+def _load_translated_text(value):
+    """
+    Loads the JSON string of a translated field, e.g. `title_translated`. The results are cached by string.
 
-        Returns:
-            str: The text corresponding to the specified language label.
+    Returns:
+        MappingProxyType: The value of each language, empty if the string is not a JSON object.
+    """
+    try:
+        translated = json.loads(value)
+    except ValueError:
+        return MappingProxyType({})
+    return MappingProxyType(translated if isinstance(translated, dict) else {})
 
-        """
-        pattern = re.compile(r'\[#(.*?)#\](.*?)(?=\[#|$)', re.DOTALL)
-        matches = pattern.findall(text)
+def _get_lang_value(values, lang_code, default_lang):
+    """
+    Gets the value of a language, or of the default language if it is empty.
 
-        for lang, content in matches:
-            if lang == language_label.replace('[#', '').replace('#]', ''):
-                return content.strip()
+    Args:
+        values (Mapping): The values by language code.
+        lang_code (str): The language code.
+        default_lang (str): The default language code.
 
-        return ''
+    Returns:
+        str: The value, or None if neither language has a value.
+    """
+    return values.get(lang_code) or values.get(default_lang) or None
 
-    lang_label = f"[#{current_lang}#]"
-    default_lang = schemingdcat_get_default_lang()
-    default_lang_label = f"[#{default_lang}#]"
+@helper
+def schemingdcat_extract_lang_text(text, current_lang):
+    """
+    Extracts the text content for a specified language from a string.
 
-    lang_text = process_language_content(lang_label, text)
+    Args:
+        text (str): The string to extract the language content from.
+            Example: "[#en#]Welcome to the CKAN Open Data Portal.[#es#]Bienvenido al portal de datos abiertos CKAN."
+        current_lang (str): The language code to extract the content for.
+            Example: "es"
 
-    if not lang_text and lang_label != default_lang_label:
-        lang_text = process_language_content(default_lang_label, text)
+    Returns:
+        str: The extracted language content, or the original string if no content is found.
+            Example: "Bienvenido al portal de datos abiertos CKAN."
 
-    if not lang_text:
+    """
+    if not isinstance(text, str) or "[#" not in text:
         return text
 
-    return lang_text
+    return _get_lang_value(
+        parse_lang_text(text), current_lang, schemingdcat_get_default_lang()
+    ) or text
 
 @helper
 def dataset_display_name(package_or_package_dict):
@@ -1051,13 +1105,12 @@ def schemingdcat_get_localized_value_from_dict(
 
     translated_field = package_or_package_dict.get(field_name + "_translated", {})
     if isinstance(translated_field, str):
-        try:
-            translated_field = json.loads(translated_field)
-        except ValueError:
-            translated_field = {}
+        translated_field = _load_translated_text(translated_field)
+    elif not isinstance(translated_field, dict):
+        translated_field = {}
 
     # Check the lang_code, if not check the default_lang, if not check the field without translation
-    return translated_field.get(lang_code) or translated_field.get(DEFAULT_LANG) or package_or_package_dict.get(field_name, default)
+    return _get_lang_value(translated_field, lang_code, DEFAULT_LANG) or package_or_package_dict.get(field_name, default)
 
 @helper
 def schemingdcat_get_readable_file_size(num, suffix="B"):
@@ -1087,6 +1140,63 @@ def schemingdcat_get_group_or_org(id, type="group"):
     """
     return logic.get_action(f"{type}_show")({}, {"id": id})
 
+def _get_cache_user():
+    """Return the name of the user of the current request, used in the keys of the
+    cached searches whose results depend on the user permissions.
+
+    Returns:
+        str: The user name, or None for anonymous users or outside a request.
+    """
+    try:
+        return getattr(p.toolkit.g, "user", None) or None
+    except (AttributeError, RuntimeError):
+        return None
+
+
+def invalidate_harvest_source_cache(source_id=None):
+    """Clear the cached dataset lists and counts of the harvest sources.
+
+    Args:
+        source_id (str, optional): Only clear the dataset lists of this harvest source. The
+            counts of all sources are always cleared, as they are computed together.
+    """
+    if source_id:
+        _harvest_source_cache.invalidate(
+            lambda key: key[0] == "counts" or key[1] == source_id
+        )
+    else:
+        _harvest_source_cache.invalidate()
+
+
+def _get_harvest_source_counts():
+    """Return the number of datasets of each harvest source, with a single facet query.
+
+    The counts are cached for `schemingdcat.harvest_source_cache_ttl` seconds per user.
+
+    Returns:
+        dict: The count of datasets by harvest source id.
+    """
+
+    def search_counts():
+        search_dict = {
+            "fq": "+harvest_source_id:[* TO *]",
+            "rows": 0,
+            "facet.field": ["harvest_source_id"],
+            "facet.limit": -1,
+            "facet.mincount": 1,
+            "include_private": True,
+        }
+        context = {"model": model, "session": model.Session}
+        result = logic.get_action("package_search")(context, search_dict)
+        return result.get("facets", {}).get("harvest_source_id", {})
+
+    return _harvest_source_cache.get_or_set(
+        ("counts", _get_cache_user()),
+        search_counts,
+        ttl=sdct_config.harvest_source_cache_ttl,
+    )
+
+
 @helper
 def schemingdcat_package_list_for_source(source_id):
     '''
@@ -1094,28 +1204,40 @@ def schemingdcat_package_list_for_source(source_id):
     source.
 
     It calls the package_list snippet and the pager.
+
+    The search is cached for `schemingdcat.harvest_source_cache_ttl` seconds per
+    user and page, and until a new harvest job of the source finishes.
     '''
     limit = 20
     page = int(request.args.get('page', 1))
-    fq = '+harvest_source_id:"{0}"'.format(source_id)
-    search_dict = {
-        'fq': fq,
-        'rows': limit,
-        'sort': 'metadata_modified desc',
-        'start': (page - 1) * limit,
-        'include_private': True
-    }
-
-    context = {'model': model, 'session': model.Session}
     harvest_source = get_harvest_source(source_id)
-    owner_org = harvest_source.get('owner_org', '')
-    if owner_org:
-        user_member_of_orgs = [org['id'] for org
-                               in ckan_helpers.organizations_available('read')]
-        if (harvest_source and owner_org in user_member_of_orgs):
-            context['ignore_capacity_check'] = True
+    last_job = (harvest_source.get('status') or {}).get('last_job') or {}
+
+    def search_source_datasets():
+        fq = '+harvest_source_id:"{0}"'.format(source_id)
+        search_dict = {
+            'fq': fq,
+            'rows': limit,
+            'sort': 'metadata_modified desc',
+            'start': (page - 1) * limit,
+            'include_private': True
+        }
 
-    query = logic.get_action('package_search')(context, search_dict)
+        context = {'model': model, 'session': model.Session}
+        owner_org = harvest_source.get('owner_org', '')
+        if owner_org:
+            user_member_of_orgs = [org['id'] for org
+                                   in ckan_helpers.organizations_available('read')]
+            if (harvest_source and owner_org in user_member_of_orgs):
+                context['ignore_capacity_check'] = True
+
+        return logic.get_action('package_search')(context, search_dict)
+
+    query = _harvest_source_cache.get_or_set(
+        ('list', source_id, _get_cache_user(), page, last_job.get('finished')),
+        search_source_datasets,
+        ttl=sdct_config.harvest_source_cache_ttl,
+    )
 
     base_url = ckan_helpers.url_for(
         '{0}.read'.format(DATASET_TYPE_NAME),
@@ -1144,17 +1266,18 @@ def schemingdcat_package_list_for_source(source_id):
         out = ckan_helpers.snippet('snippets/package_list_empty.html')
 
     return out
+
 @helper
 def schemingdcat_package_count_for_source(source_id):
     '''
     Returns the current package count for datasets associated with the given
     source id
+
+    The counts of all the sources are read with a single facet query and cached
+    for `schemingdcat.harvest_source_cache_ttl` seconds, so listing the harvest
+    sources does not run a search per source.
     '''
-    fq = '+harvest_source_id:"{0}"'.format(source_id)
-    search_dict = {'fq': fq, 'include_private': True}
-    context = {'model': model, 'session': model.Session}
-    result = logic.get_action('package_search')(context, search_dict)
-    return result.get('count', 0)
+    return _get_harvest_source_counts().get(source_id, 0)
 
 @helper
 def schemingdcat_parse_localised_date(date_=None):
@@ -1222,6 +1345,10 @@ def schemingdcat_get_schema_form_groups(entity_type=None, object_type=None, sche
 @helper
 def get_inspire_themes(*args, **kwargs) -> typing.List[typing.Dict[str, str]]:
     log.debug(f"inside get_inspire_themes {args=} {kwargs=}")
+    return _get_inspire_themes()
+
+@memoize("vocabulary", ttl=_helpers_cache_ttl)
+def _get_inspire_themes():
     try:
         inspire_themes = p.toolkit.get_action("tag_list")(
             data_dict={"vocabulary_id": sdct_config.SCHEMINGDCAT_INSPIRE_THEMES_VOCAB}
@@ -1270,6 +1397,7 @@ def get_ckan_cleaned_name(name):
     return name
 
 @helper
+@memoize("dataset", ttl=_helpers_cache_ttl)
 def get_featured_datasets(count=1):
     """
     This helper function retrieves a specified number of featured datasets from the CKAN instance. 
@@ -1294,6 +1422,7 @@ def get_featured_datasets(count=1):
     return result['results']
 
 @helper
+@memoize("dataset", ttl=_helpers_cache_ttl)
 def get_spatial_datasets(count=10):
     """
     This helper function retrieves a specified number of featured datasets from the CKAN instance. 
@@ -1354,6 +1483,7 @@ def schemingdcat_check_valid_url(url):
         return False
 
 @helper
+@memoize("group", ttl=_helpers_cache_ttl)
 def get_memberstates():
     """
     Get the list of member states groups.
@@ -1391,6 +1521,7 @@ def schemingdcat_get_current_user():
         return None
 
 @helper
+@memoize("group", ttl=_helpers_cache_ttl)
 def get_initiatives():
     """
     Get the list of initiative groups by excluding member states groups.
@@ -1399,10 +1530,8 @@ def get_initiatives():
         list: List of initiative group names, or ['Not available'] if there's an error
     """
     try:
-        # Get all groups
-        groups = p.toolkit.get_action('group_list')(
-            data_dict={'include_dataset_count': True}
-        )
+        # Get all groups (only the names are used)
+        groups = p.toolkit.get_action('group_list')(data_dict={})
         
         # Get member states groups to exclude
         memberstates = p.toolkit.get_action('group_show')(
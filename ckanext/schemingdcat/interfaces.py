@@ -83,6 +83,10 @@ class ISchemingDCATHarvester(Interface):
         """
         This method is called after the cleaning process ends.
 
+        Implementing this method makes the gather stage build all the cleaned datasets
+        in memory before creating their harvest objects, instead of creating them
+        incrementally from chunks of rows of the datasets sheet.
+
         Args:
             clean_datasets (list): The cleaned datasets.
 
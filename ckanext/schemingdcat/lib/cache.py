@@ -0,0 +1,215 @@
+import functools
+import logging
+import time
+from collections import OrderedDict
+from threading import RLock
+
+from flask import g, has_request_context
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAXSIZE = 1024
+# Attribute of flask.g with the values memoized during the current request
+REQUEST_CACHE_ATTR = '_schemingdcat_request_cache'
+
+
+class TTLCache:
+    """
+    A small thread-safe in-process cache whose entries expire after a time to live (TTL), used to
+    keep the results of expensive action calls made by template helpers.
+
+    The least recently used entries are evicted when the cache is full.
+    """
+    def __init__(self, ttl=60, maxsize=DEFAULT_MAXSIZE):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl (int, optional): Default time to live of the entries, in seconds. Defaults to 60.
+            maxsize (int, optional): Maximum number of entries. Defaults to 1024.
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = RLock()
+
+    def get(self, key, default=None):
+        """
+        Get the value of a key if it has not expired.
+
+        Args:
+            key (hashable): The key.
+            default (any, optional): The value returned if the key is missing or expired.
+
+        Returns:
+            any: The cached value or the default.
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Set the value of a key.
+
+        Args:
+            key (hashable): The key.
+            value (any): The value.
+            ttl (int, optional): Time to live of the entry, in seconds. Defaults to the cache TTL.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, func, ttl=None):
+        """
+        Get the value of a key, computing and caching it with `func` if it is missing or expired.
+
+        The value is computed outside the lock, so concurrent misses may compute it more than once.
+
+        Args:
+            key (hashable): The key.
+            func (callable): Function without arguments that returns the value.
+            ttl (int, optional): Time to live of the entry, in seconds. Defaults to the cache TTL.
+
+        Returns:
+            any: The cached or computed value.
+        """
+        if ttl is not None and ttl <= 0:
+            return func()
+
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = func()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, predicate=None):
+        """
+        Remove the entries whose key matches a predicate, or all of them.
+
+        Args:
+            predicate (callable, optional): Function that receives a key and returns True to remove it.
+        """
+        with self._lock:
+            if predicate is None:
+                self._data.clear()
+                return
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Shared caches of the memoized functions, by namespace
+_namespace_caches = {}
+_namespace_caches_lock = RLock()
+
+
+def get_namespace_cache(namespace):
+    """
+    Get the shared TTLCache of a namespace, e.g. 'dataset' or 'group', creating it if needed.
+
+    Args:
+        namespace (str): The namespace.
+
+    Returns:
+        TTLCache: The cache of the namespace.
+    """
+    with _namespace_caches_lock:
+        if namespace not in _namespace_caches:
+            _namespace_caches[namespace] = TTLCache()
+        return _namespace_caches[namespace]
+
+
+def get_request_cache():
+    """
+    Get the dict with the values memoized during the current request.
+
+    Returns:
+        dict: The request cache, or None outside a request.
+    """
+    if not has_request_context():
+        return None
+    request_cache = getattr(g, REQUEST_CACHE_ATTR, None)
+    if request_cache is None:
+        request_cache = {}
+        setattr(g, REQUEST_CACHE_ATTR, request_cache)
+    return request_cache
+
+
+def invalidate(*namespaces):
+    """
+    Clear the shared caches of the given namespaces, or all of them, and the cache of the current request.
+
+    Args:
+        *namespaces (str): The namespaces to clear. All if none is given.
+    """
+    with _namespace_caches_lock:
+        caches = [
+            cache for namespace, cache in _namespace_caches.items()
+            if not namespaces or namespace in namespaces
+        ]
+    for cache in caches:
+        cache.invalidate()
+
+    request_cache = get_request_cache()
+    if request_cache:
+        if namespaces:
+            for key in [key for key in request_cache if key[0] in namespaces]:
+                del request_cache[key]
+        else:
+            request_cache.clear()
+
+
+def memoize(namespace, ttl=None):
+    """
+    Decorator that memoizes the result of a function for the current request and, if the TTL is greater than 0, in the shared cache of a namespace.
+
+    The arguments of the function must be hashable, otherwise the result is not memoized.
+
+    Args:
+        namespace (str): The namespace of the cache, used to invalidate it, e.g. 'dataset' when datasets change.
+        ttl (int or callable, optional): Time to live in seconds, or a function that returns it, so it can be read from the configuration on each call. Defaults to the TTL of the cache.
+
+    Returns:
+        function: The decorator.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (namespace, fn.__module__, fn.__qualname__, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                return fn(*args, **kwargs)
+
+            request_cache = get_request_cache()
+            if request_cache is not None and key in request_cache:
+                return request_cache[key]
+
+            cache_ttl = ttl() if callable(ttl) else ttl
+            value = get_namespace_cache(namespace).get_or_set(
+                key, lambda: fn(*args, **kwargs), ttl=cache_ttl
+            )
+
+            if request_cache is not None:
+                request_cache[key] = value
+            return value
+
+        wrapper.invalidate = lambda: invalidate(namespace)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,108 @@
+import json
+import logging
+from collections import namedtuple
+from threading import Lock
+
+import ckanext.scheming.helpers as sh
+
+import ckanext.schemingdcat.config as sdct_config
+from ckanext.schemingdcat.lib.cache import get_namespace_cache
+
+log = logging.getLogger(__name__)
+
+# Namespace of the cache of the choices returned by `choices_helper` functions, cleared when
+# groups or organizations change but not when datasets change
+DYNAMIC_CHOICES_NAMESPACE = 'choices'
+STATIC_CHOICES_MAXSIZE = 1024
+
+# Indexes of the fields with static choices, by field, see get_choice_index()
+_static_choice_indexes = {}
+_static_choice_indexes_lock = Lock()
+
+
+class ChoiceIndex(namedtuple('ChoiceIndex', ['order', 'values', 'choices', 'geometries'])):
+    """
+    The choices of a scheming field, indexed for the validators.
+
+    Attributes:
+        order (tuple): The choice values, in the order of the schema.
+        values (frozenset): The choice values.
+        choices (dict): The first choice of each value.
+        geometries (dict): The parsed GeoJSON `spatial` geometry of each value that has a valid one.
+    """
+    __slots__ = ()
+
+
+def _load_geometry(spatial):
+    if isinstance(spatial, dict):
+        return spatial
+    try:
+        geometry = json.loads(spatial)
+    except (TypeError, ValueError):
+        return None
+    return geometry if isinstance(geometry, dict) else None
+
+
+def build_choice_index(choices):
+    """
+    Build the index of a list of scheming choices.
+
+    Args:
+        choices (list): The choices, dicts with a `value` and optionally a `spatial` GeoJSON geometry.
+
+    Returns:
+        ChoiceIndex: The index of the choices.
+    """
+    order = []
+    indexed_choices = {}
+    geometries = {}
+    for choice in choices or []:
+        value = choice['value']
+        order.append(value)
+        if value in indexed_choices:
+            continue
+        indexed_choices[value] = choice
+        if choice.get('spatial'):
+            geometry = _load_geometry(choice['spatial'])
+            if geometry is not None:
+                geometries[value] = geometry
+            else:
+                log.debug('Invalid spatial geometry of the choice: %s', value)
+
+    return ChoiceIndex(tuple(order), frozenset(order), indexed_choices, geometries)
+
+
+def get_choice_index(field):
+    """
+    Get the index of the choices of a scheming field.
+
+    The indexes of the static choices are built once per field of the loaded schemas (a reload
+    of the schemas creates new choice lists), while the choices of `choices_helper` fields, which
+    may be read from the database, are cached for `schemingdcat.choices_cache_ttl` seconds.
+
+    Args:
+        field (dict): The scheming field definition.
+
+    Returns:
+        ChoiceIndex: The index of the choices of the field.
+    """
+    choices = field.get('choices')
+    if choices is not None or 'choices_helper' not in field:
+        key = (field.get('field_name'), id(choices))
+        entry = _static_choice_indexes.get(key)
+        # The entry keeps a reference to the choices, so their id is not reused while it exists
+        if entry and entry[0] is choices:
+            return entry[1]
+
+        choice_index = build_choice_index(choices)
+        with _static_choice_indexes_lock:
+            if len(_static_choice_indexes) >= STATIC_CHOICES_MAXSIZE:
+                _static_choice_indexes.clear()
+            _static_choice_indexes[key] = (choices, choice_index)
+        return choice_index
+
+    return get_namespace_cache(DYNAMIC_CHOICES_NAMESPACE).get_or_set(
+        (field.get('field_name'), field['choices_helper']),
+        lambda: build_choice_index(sh.scheming_field_choices(field)),
+        ttl=sdct_config.choices_cache_ttl,
+    )
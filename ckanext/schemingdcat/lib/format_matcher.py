@@ -0,0 +1,146 @@
+import mimetypes
+import posixpath
+import re
+from functools import lru_cache
+
+from ckanext.schemingdcat.config import OGC2CKAN_MD_FORMATS, CUSTOM_FORMAT_RULES
+
+
+def _compile_first_match(patterns):
+    """
+    Compile a list of substrings into a single regex that finds, in one scan of a text, the
+    first substring of the list (in list order) contained in it.
+
+    A lookahead alternation in list order is tried at every position of the text, so the
+    substring with the lowest index among all the matches is the lowest index among the
+    matches of each position.
+
+    Args:
+        patterns (list): The lowercase substrings.
+
+    Returns:
+        tuple: The compiled regex (None if there are no substrings) and the index of each substring.
+    """
+    order = {}
+    for index, pattern in enumerate(patterns):
+        order.setdefault(pattern, index)
+    if not order:
+        return None, order
+    alternation = '|'.join(re.escape(pattern) for pattern in order)
+    return re.compile(f'(?=({alternation}))'), order
+
+
+def _first_match(regex, order, text):
+    if regex is None or not text:
+        return None
+    return min((order[match.group(1)] for match in regex.finditer(text)), default=None)
+
+
+class FormatMatcher:
+    """
+    Classifies the format of a distribution from its format string, title, description and URL.
+
+    The format names of `OGC2CKAN_MD_FORMATS` and the format strings and URL patterns of
+    `CUSTOM_FORMAT_RULES` are compiled once into single regexes, so each text is scanned once
+    instead of once per name or rule, and the rules matched by each format string are memoized.
+    """
+    def __init__(self, md_formats=OGC2CKAN_MD_FORMATS, custom_format_rules=CUSTOM_FORMAT_RULES):
+        """
+        Compile the matcher.
+
+        Args:
+            md_formats (dict): The known formats, by name.
+            custom_format_rules (list): The custom format rules, in order of priority.
+        """
+        self._md_format_keys = list(md_formats)
+        self._md_formats_regex, md_order = _compile_first_match([key.lower() for key in self._md_format_keys])
+        # Index of the first key of each lowercase name
+        self._md_formats_order = md_order
+
+        self._rules = [
+            (rule['format'].upper(), rule['mimetype'].strip())
+            for rule in custom_format_rules
+        ]
+        format_patterns, format_rules = [], []
+        url_patterns, url_rules = [], []
+        for index, rule in enumerate(custom_format_rules):
+            for format_string in rule['format_strings'] or []:
+                format_patterns.append(format_string.lower())
+                format_rules.append(index)
+            if rule['url_string']:
+                url_patterns.append(rule['url_string'].lower())
+                url_rules.append(index)
+        self._format_rules_regex, format_order = _compile_first_match(format_patterns)
+        self._format_rules = format_rules
+        self._format_order = format_order
+        self._url_rules_regex, url_order = _compile_first_match(url_patterns)
+        self._url_rules = url_rules
+        self._url_order = url_order
+
+        self._match_format_rule = lru_cache(maxsize=4096)(self._match_format_rule)
+
+    def match_md_format(self, text):
+        """
+        Get the first name of `OGC2CKAN_MD_FORMATS` (in dict order) contained in a lowercase text.
+
+        Args:
+            text (str): The lowercase text, e.g. the title, URL and description of a distribution.
+
+        Returns:
+            str: The format name, or None.
+        """
+        index = _first_match(self._md_formats_regex, self._md_formats_order, text)
+        return self._md_format_keys[index] if index is not None else None
+
+    def _match_format_rule(self, format_lower):
+        index = _first_match(self._format_rules_regex, self._format_order, format_lower)
+        return self._format_rules[index] if index is not None else None
+
+    def _match_url_rule(self, url_lower):
+        index = _first_match(self._url_rules_regex, self._url_order, url_lower)
+        return self._url_rules[index] if index is not None else None
+
+    def match_custom_format(self, res_format, url=None):
+        """
+        Get the format and mimetype of the first custom format rule that matches a format or URL.
+
+        Args:
+            res_format (str): The format of the distribution.
+            url (str, optional): The URL of the distribution.
+
+        Returns:
+            tuple: The format and mimetype of the rule, or None if no rule matches.
+        """
+        matches = [
+            index for index in (
+                self._match_format_rule(res_format.lower()),
+                self._match_url_rule(url.lower() if url else ''),
+            )
+            if index is not None
+        ]
+        return self._rules[min(matches)] if matches else None
+
+
+@lru_cache(maxsize=1024)
+def _guess_type_by_extensions(extensions):
+    return mimetypes.guess_type('file' + extensions)
+
+
+def guess_type(url):
+    """
+    Memoized `mimetypes.guess_type` of a URL, by the extensions it looks at.
+
+    Args:
+        url (str): The URL or file name.
+
+    Returns:
+        tuple: The mimetype and encoding, as returned by `mimetypes.guess_type`.
+    """
+    if not url or url.startswith('data:'):
+        return mimetypes.guess_type(url or '')
+    base, extension = posixpath.splitext(url)
+    previous_extension = posixpath.splitext(base)[1]
+    return _guess_type_by_extensions(previous_extension + extension)
+
+
+format_matcher = FormatMatcher()
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from urllib.parse import urlparse
+
+import requests
+
+from ckanext.schemingdcat.config import mimetype_base_uri, OGC2CKAN_HARVESTER_MD_CONFIG
+from ckanext.schemingdcat.lib.cache import TTLCache
+from ckanext.schemingdcat.lib.format_matcher import guess_type
+
+try:
+    from ckan.lib.redis import connect_to_redis
+except ImportError:
+    connect_to_redis = None
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_MAX_PER_HOST = 2
+DEFAULT_CACHE_TTL = 86400
+# Results guessed from the URL after a failed request are kept for less time
+DEFAULT_FAILURE_TTL = 3600
+CACHE_KEY_PREFIX = 'schemingdcat:format:'
+# Semaphores of the hosts requested recently. The least recently used hosts are dropped, so a
+# long-lived resolver does not keep a semaphore for every host it has ever requested.
+HOST_SEMAPHORES_TTL = 3600
+HOST_SEMAPHORES_MAXSIZE = 1024
+
+# In-process cache used when Redis is not available
+_local_cache = TTLCache(ttl=DEFAULT_CACHE_TTL, maxsize=10000)
+
+
+def guess_format_from_url(url):
+    """
+    Guess the format, mimetype and encoding of a file from the extension of its URL.
+
+    Args:
+        url (str): The URL of the file.
+
+    Returns:
+        tuple: The format, mimetype and encoding of the file.
+    """
+    mimetype, encoding = guess_type(url)
+    format = mimetype.split('/')[-1].upper() if mimetype else url.rsplit('.', 1)[-1]
+    encoding = encoding or OGC2CKAN_HARVESTER_MD_CONFIG["encoding"]
+    mimetype = f"{mimetype_base_uri}/{mimetype}" if mimetype else None
+    return format, mimetype, encoding
+
+
+def infer_format_from_url(url, timeout=DEFAULT_TIMEOUT):
+    """
+    Infers the format and encoding of a file from its URL.
+
+    Sends a HEAD request to the URL and checks the 'content-type' header. If the header is not
+    found or the request fails, it falls back to guessing the format from the URL's extension.
+
+    Args:
+        url (str): The URL of the file.
+        timeout (int, optional): Timeout of the request, in seconds. Defaults to 10.
+
+    Returns:
+        tuple: The format, mimetype and encoding of the file, and whether the remote server answered with a content type.
+    """
+    try:
+        response = requests.head(url, allow_redirects=True, timeout=timeout)
+        content_type = response.headers.get('content-type')
+    except Exception as e:
+        log.debug('Unable to get the content type of %s: %s', url, e)
+        content_type = None
+
+    if not content_type:
+        return guess_format_from_url(url) + (False,)
+
+    mimetype, *encoding = content_type.split(';')
+    format = mimetype.split('/')[-1]
+    encoding = encoding[0].split('charset=')[-1] if encoding and 'charset=' in encoding[0] else OGC2CKAN_HARVESTER_MD_CONFIG["encoding"]
+    mimetype = f"{mimetype_base_uri}/{mimetype}" if mimetype else None
+
+    return format, mimetype, encoding, True
+
+
+class FormatResolver:
+    """
+    Resolves the format of distribution URLs concurrently, with request timeouts, a limit of
+    concurrent requests per host and a cache by URL shared by all the processes (Redis) or, if
+    Redis is not available, by the current process.
+    """
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_workers=DEFAULT_MAX_WORKERS,
+                 max_per_host=DEFAULT_MAX_PER_HOST, cache_ttl=DEFAULT_CACHE_TTL,
+                 failure_ttl=DEFAULT_FAILURE_TTL):
+        """
+        Initialize the resolver.
+
+        Args:
+            timeout (int, optional): Timeout of each request, in seconds. Defaults to 10.
+            max_workers (int, optional): Maximum number of concurrent requests. Defaults to 8.
+            max_per_host (int, optional): Maximum number of concurrent requests to the same host. Defaults to 2.
+            cache_ttl (int, optional): Seconds to cache the formats returned by the remote servers. Defaults to 86400.
+            failure_ttl (int, optional): Seconds to cache the formats guessed after a failed request. Defaults to 3600.
+        """
+        self.timeout = timeout
+        self.max_workers = max(1, max_workers)
+        self.max_per_host = max(1, max_per_host)
+        self.cache_ttl = cache_ttl
+        self.failure_ttl = failure_ttl
+        self._host_semaphores = TTLCache(ttl=HOST_SEMAPHORES_TTL, maxsize=HOST_SEMAPHORES_MAXSIZE)
+        self._host_semaphores_lock = Lock()
+        self._redis = None
+        if connect_to_redis is not None:
+            try:
+                self._redis = connect_to_redis()
+            except Exception as e:
+                log.debug('Redis not available for the format cache: %s', e)
+
+    @staticmethod
+    def _cache_key(url):
+        return CACHE_KEY_PREFIX + hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _get_cached(self, url):
+        key = self._cache_key(url)
+        if self._redis is not None:
+            try:
+                value = self._redis.get(key)
+                return tuple(json.loads(value)) if value else None
+            except Exception as e:
+                log.debug('Unable to read the format cache: %s', e)
+        return _local_cache.get(key)
+
+    def _set_cached(self, url, value, ttl):
+        key = self._cache_key(url)
+        if self._redis is not None:
+            try:
+                self._redis.setex(key, ttl, json.dumps(value))
+                return
+            except Exception as e:
+                log.debug('Unable to write the format cache: %s', e)
+        _local_cache.set(key, value, ttl)
+
+    def _get_host_semaphore(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._host_semaphores_lock:
+            semaphore = self._host_semaphores.get(host) or BoundedSemaphore(self.max_per_host)
+            # Set it again to extend its TTL while the host is being requested
+            self._host_semaphores.set(host, semaphore)
+            return semaphore
+
+    def _fetch(self, url):
+        with self._get_host_semaphore(url):
+            format, mimetype, encoding, answered = infer_format_from_url(url, timeout=self.timeout)
+        value = (format, mimetype, encoding)
+        self._set_cached(url, value, self.cache_ttl if answered else self.failure_ttl)
+        return value
+
+    def resolve(self, url):
+        """
+        Resolve the format of a URL, from the cache if possible.
+
+        Args:
+            url (str): The URL of the file.
+
+        Returns:
+            tuple: The format, mimetype and encoding of the file.
+        """
+        if not url:
+            return None, None, None
+        return self._get_cached(url) or self._fetch(url)
+
+    def resolve_many(self, urls):
+        """
+        Resolve the formats of several URLs concurrently. The cached URLs are not requested.
+
+        Args:
+            urls (iterable): The URLs of the files.
+
+        Returns:
+            dict: The (format, mimetype, encoding) of each URL.
+        """
+        results = {}
+        pending = []
+        for url in dict.fromkeys(url for url in urls if url):
+            cached = self._get_cached(url)
+            if cached:
+                results[url] = cached
+            else:
+                pending.append(url)
+
+        if len(pending) == 1:
+            results[pending[0]] = self._fetch(pending[0])
+        elif pending:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as executor:
+                for url, value in zip(pending, executor.map(self._fetch, pending)):
+                    results[url] = value
+
+        return results
@@ -0,0 +1,274 @@
+from collections import namedtuple
+from functools import lru_cache
+import logging
+
+log = logging.getLogger(__name__)
+
+# Top-level boolean operators that can be dropped (AND) or that prevent the rewriting (OR, NOT)
+AND_OPERATORS = {'AND', '&&'}
+UNSUPPORTED_OPERATORS = {'OR', '||', 'NOT', '!'}
+
+
+class FQClause(namedtuple('FQClause', ['prefix', 'field', 'value'])):
+    """
+    A top-level clause of a Solr filter query (fq), e.g. `+tags:"Environment"`.
+
+    Attributes:
+        prefix (str): The occur operator of the clause: '+', '-' or ''.
+        field (str): The field name, or None for a clause without a field, e.g. a group `(a OR b)`.
+        value (str): The raw value of the clause, with its quotes or brackets.
+    """
+    __slots__ = ()
+
+    @property
+    def text(self):
+        """The clause as Lucene query syntax."""
+        if self.field is None:
+            return f'{self.prefix}{self.value}'
+        return f'{self.prefix}{self.field}:{self.value}'
+
+
+def _scan_value(fq, start):
+    """
+    Find the end of the value that starts at the given position: a quoted phrase, a group or
+    range delimited by brackets, or a bare term.
+
+    Args:
+        fq (str): The filter query.
+        start (int): The position where the value starts.
+
+    Returns:
+        int: The position after the end of the value.
+
+    Raises:
+        ValueError: If the quotes or brackets are unbalanced.
+    """
+    length = len(fq)
+    char = fq[start]
+
+    if char == '"':
+        pos = start + 1
+        while pos < length:
+            if fq[pos] == '\\':
+                pos += 2
+                continue
+            if fq[pos] == '"':
+                return pos + 1
+            pos += 1
+        raise ValueError(f'Unbalanced quotes in fq: {fq}')
+
+    if char in '([{':
+        depth = 0
+        in_quotes = False
+        pos = start
+        while pos < length:
+            char = fq[pos]
+            if char == '\\':
+                pos += 2
+                continue
+            if in_quotes:
+                if char == '"':
+                    in_quotes = False
+            elif char == '"':
+                in_quotes = True
+            elif char in '([{':
+                depth += 1
+            elif char in ')]}':
+                depth -= 1
+                if depth == 0:
+                    return pos + 1
+            pos += 1
+        raise ValueError(f'Unbalanced brackets in fq: {fq}')
+
+    pos = start
+    while pos < length and not fq[pos].isspace():
+        pos += 2 if fq[pos] == '\\' else 1
+    return min(pos, length)
+
+
+def _find_field_separator(fq, start):
+    """
+    Get the position of the ':' that ends the field name starting at the given position, if any.
+
+    Returns:
+        int: The position of the separator, or -1 if the clause has no field.
+    """
+    pos = start
+    while pos < len(fq):
+        char = fq[pos]
+        if char == ':':
+            return pos if pos > start else -1
+        if char.isspace() or char in '()[]{}"\\':
+            return -1
+        pos += 1
+    return -1
+
+
+@lru_cache(maxsize=512)
+def parse_fq(fq):
+    """
+    Parse the top-level clauses of a Solr filter query (fq).
+
+    Only flat queries, which are the ones built by the CKAN search page (e.g.
+    `tags:"a" res_format:"CSV" +dataset_type:dataset`), are parsed. Clauses joined with
+    AND are kept as separate clauses, while queries with top-level OR/NOT operators or
+    local params are not parsed.
+
+    Args:
+        fq (str): The filter query.
+
+    Returns:
+        tuple: The FQClause of the query, or None if the query cannot be parsed.
+    """
+    if not fq:
+        return ()
+    if fq.lstrip().startswith('{!'):
+        return None
+
+    clauses = []
+    pos = 0
+    length = len(fq)
+    try:
+        while pos < length:
+            if fq[pos].isspace():
+                pos += 1
+                continue
+
+            prefix = ''
+            if fq[pos] in '+-':
+                prefix = fq[pos]
+                pos += 1
+                if pos >= length or fq[pos].isspace():
+                    return None
+
+            # Negation with '!', e.g. `!tags:"a"`
+            if fq[pos] == '!':
+                return None
+
+            field = None
+            separator = _find_field_separator(fq, pos)
+            if separator != -1:
+                field = fq[pos:separator]
+                pos = separator + 1
+                if pos >= length or fq[pos].isspace():
+                    return None
+
+            end = _scan_value(fq, pos)
+            value = fq[pos:end]
+            pos = end
+
+            if field is None and not prefix:
+                if value in AND_OPERATORS:
+                    continue
+                if value in UNSUPPORTED_OPERATORS:
+                    return None
+
+            clauses.append(FQClause(prefix, field, value))
+    except ValueError as e:
+        log.debug('[parse_fq] %s', e)
+        return None
+
+    return tuple(clauses)
+
+
+@lru_cache(maxsize=1024)
+def rewrite_fq_facet_operator(fq, facet_fields):
+    """
+    Rewrite a filter query so that the values selected for the same facet field are joined
+    with OR, while the facet fields and the rest of the clauses are still required (AND).
+
+    e.g. `tags:"a" res_format:"CSV" tags:"b"` -> `+(tags:"a" OR tags:"b") +res_format:"CSV"`
+
+    Args:
+        fq (str): The filter query.
+        facet_fields (tuple): The facet field names.
+
+    Returns:
+        str: The rewritten filter query, or the original one if it cannot be parsed or has no facet clauses.
+    """
+    clauses = parse_fq(fq)
+    if not clauses:
+        return fq
+
+    facet_fields = set(facet_fields)
+    facet_groups = {}
+    parts = []
+    for clause in clauses:
+        if not clause.prefix and clause.field in facet_fields:
+            if clause.field not in facet_groups:
+                facet_groups[clause.field] = []
+                parts.append(clause.field)
+            facet_groups[clause.field].append(clause.text)
+        else:
+            parts.append(clause)
+
+    if not facet_groups:
+        return fq
+
+    new_fq = []
+    for part in parts:
+        if isinstance(part, FQClause):
+            new_fq.append(part.text if part.prefix else f'+{part.text}')
+        else:
+            values = facet_groups[part]
+            new_fq.append(f'+{values[0]}' if len(values) == 1 else f'+({" OR ".join(values)})')
+
+    return ' '.join(new_fq)
+
+
+def get_facet_filter_tag(field):
+    """
+    Get the Solr local param tag used to filter by a facet field, e.g. `sdct_tags`.
+
+    Args:
+        field (str): The facet field name.
+
+    Returns:
+        str: The tag name.
+    """
+    return 'sdct_' + ''.join(char if char.isalnum() or char == '_' else '_' for char in field)
+
+
+@lru_cache(maxsize=1024)
+def decompose_fq_facet_filters(fq, facet_fields):
+    """
+    Split the clauses of the facet fields out of a filter query into one tagged filter per
+    facet field, with its values joined with OR, so that Solr caches each facet filter on its
+    own and facet counts can exclude it (multi-select faceting).
+
+    e.g. `tags:"a" res_format:"CSV" tags:"b" +dataset_type:dataset` ->
+        fq: `+dataset_type:dataset`
+        filters: `{!tag=sdct_tags}(tags:"a" OR tags:"b")`, `{!tag=sdct_res_format}res_format:"CSV"`
+
+    Args:
+        fq (str): The filter query.
+        facet_fields (tuple): The facet field names.
+
+    Returns:
+        tuple: The remaining filter query and a tuple of (field, tag, filter) for each facet
+            field with clauses. If the query cannot be parsed or has no facet clauses, the
+            original filter query and an empty tuple.
+    """
+    clauses = parse_fq(fq)
+    if not clauses:
+        return fq, ()
+
+    facet_fields = set(facet_fields)
+    facet_groups = {}
+    other_clauses = []
+    for clause in clauses:
+        if not clause.prefix and clause.field in facet_fields:
+            facet_groups.setdefault(clause.field, []).append(clause.text)
+        else:
+            other_clauses.append(clause.text if clause.prefix else f'+{clause.text}')
+
+    if not facet_groups:
+        return fq, ()
+
+    filters = []
+    for field, values in facet_groups.items():
+        tag = get_facet_filter_tag(field)
+        query = values[0] if len(values) == 1 else f'({" OR ".join(values)})'
+        filters.append((field, tag, f'{{!tag={tag}}}{query}'))
+
+    return ' '.join(other_clauses), tuple(filters)
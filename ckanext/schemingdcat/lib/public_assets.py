@@ -0,0 +1,162 @@
+import logging
+import os
+import time
+from threading import Lock
+
+log = logging.getLogger(__name__)
+
+# Seconds between the checks of the modification times of the public directories
+DEFAULT_REFRESH_INTERVAL = 60
+
+
+def _normalize_path(path):
+    """
+    Normalize a public path, e.g. `/images/icons/theme` -> `images/icons/theme`.
+    """
+    return path.replace('\\', '/').strip('/') if path else ''
+
+
+class PublicAssetIndex:
+    """
+    An in-memory index of the files and directories of the public directories (`extra_public_paths`),
+    so checking whether a public asset exists is a set lookup instead of a filesystem probe per
+    public directory. Misses are answered from the index as well.
+
+    The index is rebuilt when the modification time of any of the indexed directories changes,
+    which happens when entries are added to or removed from it. The modification times are
+    checked at most once per refresh interval.
+    """
+    def __init__(self, public_dirs, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        """
+        Initialize and build the index.
+
+        Args:
+            public_dirs (list): The public directories.
+            refresh_interval (int, optional): Seconds between the checks for changes, 0 to never refresh the index. Defaults to 60.
+        """
+        self.public_dirs = [public_dir.strip() for public_dir in public_dirs if public_dir and public_dir.strip()]
+        self.refresh_interval = refresh_interval
+        self.version = 0
+        self._lock = Lock()
+        self._files = frozenset()
+        self._dirs = frozenset()
+        self._dir_mtimes = {}
+        self._checked = 0
+        self.build()
+
+    def _scan(self):
+        """
+        Walk the public directories.
+
+        Returns:
+            tuple: The relative paths of the files and directories, and the modification time of each walked directory.
+        """
+        files, dirs, dir_mtimes = set(), set(), {}
+        for public_dir in self.public_dirs:
+            if not os.path.isdir(public_dir):
+                continue
+            visited = set()
+            for root, dirnames, filenames in os.walk(public_dir, followlinks=True):
+                try:
+                    real_root = os.path.realpath(root)
+                    dir_mtimes[root] = os.stat(root).st_mtime_ns
+                except OSError:
+                    dirnames[:] = []
+                    continue
+                # Avoid loops of symlinks
+                if real_root in visited:
+                    dirnames[:] = []
+                    continue
+                visited.add(real_root)
+
+                relative_root = os.path.relpath(root, public_dir)
+                prefix = '' if relative_root == os.curdir else relative_root.replace(os.sep, '/') + '/'
+                dirs.update(prefix + name for name in dirnames)
+                files.update(prefix + name for name in filenames)
+
+        return frozenset(files), frozenset(dirs), dir_mtimes
+
+    def build(self):
+        """
+        Build the index from the public directories.
+        """
+        files, dirs, dir_mtimes = self._scan()
+        with self._lock:
+            self._files, self._dirs, self._dir_mtimes = files, dirs, dir_mtimes
+            self._checked = time.monotonic()
+            self.version += 1
+        log.debug('Public asset index built: %s files, %s directories', len(files), len(dirs))
+
+    def _changed(self):
+        for path, mtime in self._dir_mtimes.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def refresh(self):
+        """
+        Rebuild the index if the refresh interval has passed and the public directories have changed.
+
+        Returns:
+            bool: True if the index was rebuilt.
+        """
+        if self.refresh_interval <= 0 or time.monotonic() - self._checked < self.refresh_interval:
+            return False
+
+        with self._lock:
+            if time.monotonic() - self._checked < self.refresh_interval:
+                return False
+            self._checked = time.monotonic()
+
+        if not self._changed():
+            return False
+
+        self.build()
+        return True
+
+    def file_exists(self, path):
+        """
+        Check if a file exists in the public directories.
+
+        Args:
+            path (str): The public path of the file, e.g. `images/icons/theme/agri.svg`.
+
+        Returns:
+            bool: True if the file exists.
+        """
+        self.refresh()
+        return _normalize_path(path) in self._files
+
+    def dir_exists(self, path):
+        """
+        Check if a directory exists in the public directories.
+
+        Args:
+            path (str): The public path of the directory, e.g. `images/icons/theme`.
+
+        Returns:
+            bool: True if the directory exists.
+        """
+        self.refresh()
+        return _normalize_path(path) in self._dirs
+
+    def find_file(self, path, extensions):
+        """
+        Find the first extension of a list for which a file exists in the public directories.
+
+        Args:
+            path (str): The public path of the file without extension.
+            extensions (list): The extensions to try, in order, e.g. `['.svg', '.png']`.
+
+        Returns:
+            str: The path with the first existing extension, or None.
+        """
+        self.refresh()
+        normalized_path = _normalize_path(path)
+        for extension in extensions:
+            if normalized_path + extension in self._files:
+                return path + extension
+        return None
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import logging
+from threading import Lock
+
+from ckanext.schemingdcat.lib.cache import TTLCache
+
+try:
+    from ckan.lib.redis import connect_to_redis
+except ImportError:
+    connect_to_redis = None
+
+log = logging.getLogger(__name__)
+
+# Counter of the changes of datasets, groups and organizations, part of the keys of the cached pages
+VERSION_KEY = 'schemingdcat:search:version'
+PAGE_KEY_PREFIX = 'schemingdcat:search:page:'
+LOCAL_CACHE_MAXSIZE = 256
+
+
+class SearchPageCache:
+    """
+    A cache of the search pages rendered for anonymous users, keyed by the dataset type, the
+    locale and the normalized query parameters.
+
+    The keys include a change counter that is incremented when datasets, groups or organizations
+    change, so the pages cached before a change are not served anymore and expire on their own.
+    The pages and the counter are stored in Redis, so they are shared by all the web workers, or,
+    if Redis is not available, in the memory of each process.
+    """
+    def __init__(self):
+        self._redis = None
+        self._redis_checked = False
+        self._lock = Lock()
+        self._local_cache = TTLCache(maxsize=LOCAL_CACHE_MAXSIZE)
+        self._local_version = 0
+
+    def _get_redis(self):
+        if not self._redis_checked:
+            with self._lock:
+                if not self._redis_checked:
+                    if connect_to_redis is not None:
+                        try:
+                            self._redis = connect_to_redis()
+                        except Exception as e:
+                            log.debug('Redis not available for the search page cache: %s', e)
+                    self._redis_checked = True
+        return self._redis
+
+    def get_version(self):
+        """
+        Get the current value of the change counter.
+
+        Returns:
+            int: The change counter.
+        """
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                return int(redis.get(VERSION_KEY) or 0)
+            except Exception as e:
+                log.debug('Unable to read the search cache version: %s', e)
+        return self._local_version
+
+    def bump_version(self):
+        """
+        Increment the change counter, so the cached pages are not served anymore.
+        """
+        with self._lock:
+            self._local_version += 1
+        self._local_cache.invalidate()
+
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                redis.incr(VERSION_KEY)
+            except Exception as e:
+                log.warning('Unable to increment the search cache version: %s', e)
+
+    def make_key(self, package_type, lang, params):
+        """
+        Build the cache key of a search page.
+
+        Args:
+            package_type (str): The dataset type.
+            lang (str): The locale of the page.
+            params (MultiDict): The query parameters of the request.
+
+        Returns:
+            str: The cache key, with the current change counter.
+        """
+        normalized_params = sorted(
+            (name, values) for name, values in params.lists()
+            if any(value != '' for value in values)
+        )
+        digest = hashlib.sha1(
+            json.dumps([package_type, lang, normalized_params], ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+        return f'{PAGE_KEY_PREFIX}{self.get_version()}:{digest}'
+
+    def get(self, key):
+        """
+        Get a cached page.
+
+        Returns:
+            str: The page, or None if it is not cached.
+        """
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                value = redis.get(key)
+                return value.decode('utf-8') if value is not None else None
+            except Exception as e:
+                log.debug('Unable to read the search page cache: %s', e)
+        return self._local_cache.get(key)
+
+    def set(self, key, page, ttl):
+        """
+        Cache a page.
+
+        Args:
+            key (str): The cache key, from `make_key`.
+            page (str): The rendered page.
+            ttl (int): Seconds to cache the page.
+        """
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                redis.setex(key, ttl, page.encode('utf-8'))
+                return
+            except Exception as e:
+                log.debug('Unable to write the search page cache: %s', e)
+        self._local_cache.set(key, page, ttl)
+
+
+search_page_cache = SearchPageCache()
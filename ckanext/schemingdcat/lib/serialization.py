@@ -0,0 +1,165 @@
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+log = logging.getLogger(__name__)
+
+# Marker prepended to compressed harvest object content. Plain JSON content never starts with it.
+COMPRESSED_CONTENT_PREFIX = 'zlib+b64:'
+DEFAULT_COMPRESSION_LEVEL = 6
+
+
+def _json_dumps(obj):
+    return json.dumps(obj)
+
+
+def _json_loads(content):
+    return json.loads(content)
+
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+
+
+def _orjson_loads(content):
+    return orjson.loads(content)
+
+
+def _msgspec_dumps(obj):
+    return msgspec.json.encode(obj).decode('utf-8')
+
+
+def _msgspec_loads(content):
+    try:
+        return msgspec.json.decode(content)
+    except msgspec.DecodeError as e:
+        raise ValueError(str(e)) from e
+
+
+# Available JSON backends (name: (dumps, loads)), ordered by preference.
+JSON_BACKENDS = {}
+if orjson is not None:
+    JSON_BACKENDS['orjson'] = (_orjson_dumps, _orjson_loads)
+if msgspec is not None:
+    JSON_BACKENDS['msgspec'] = (_msgspec_dumps, _msgspec_loads)
+JSON_BACKENDS['json'] = (_json_dumps, _json_loads)
+
+
+def get_default_backend():
+    """
+    Returns the name of the fastest JSON backend installed.
+
+    Returns:
+        str: One of 'orjson', 'msgspec' or 'json'.
+    """
+    return next(iter(JSON_BACKENDS))
+
+
+def fingerprint(obj, salt=''):
+    """
+    Returns a stable fingerprint of a JSON serializable object: the SHA-256 of its JSON with sorted keys.
+
+    Args:
+        obj (any): The JSON serializable object.
+        salt (str, optional): A string hashed along with the object, e.g. a hash of the harvest source config. Defaults to ''.
+
+    Returns:
+        str: The SHA-256 hex digest.
+    """
+    content = None
+    if orjson is not None:
+        try:
+            content = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            content = None
+    if content is None:
+        content = json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+
+    return hashlib.sha256(salt.encode('utf-8') + content).hexdigest()
+
+
+class HarvestContentSerializer:
+    """
+    Serializes the content of harvest objects using the fastest JSON backend available (orjson, msgspec or the stdlib json) and, optionally, compresses it before it is stored in the harvest_object table.
+
+    Compressed content is stored as base64 text with the `COMPRESSED_CONTENT_PREFIX` marker, so `loads` reads both compressed and plain JSON content regardless of the current settings.
+    """
+    def __init__(self, backend=None, compress=False, compression_level=DEFAULT_COMPRESSION_LEVEL):
+        """
+        Initialize the serializer.
+
+        Args:
+            backend (str, optional): Name of the JSON backend ('orjson', 'msgspec' or 'json'). Defaults to the fastest installed.
+            compress (bool, optional): Whether to compress the serialized content. Defaults to False.
+            compression_level (int, optional): zlib compression level (1-9). Defaults to 6.
+        """
+        if not backend or backend == 'auto':
+            backend = get_default_backend()
+        elif backend not in JSON_BACKENDS:
+            log.warning('JSON backend "%s" is not available, using "%s"', backend, get_default_backend())
+            backend = get_default_backend()
+
+        self.backend = backend
+        self.compress = compress
+        self.compression_level = compression_level
+        self._dumps, self._loads = JSON_BACKENDS[backend]
+
+    def dumps(self, obj):
+        """
+        Serializes an object to the text stored in HarvestObject.content.
+
+        Args:
+            obj (any): The JSON serializable object.
+
+        Returns:
+            str: The JSON (or compressed JSON) text.
+        """
+        try:
+            content = self._dumps(obj)
+        except TypeError:
+            # Fast backends are stricter than the stdlib json with some types
+            content = _json_dumps(obj)
+
+        if self.compress:
+            compressed = zlib.compress(content.encode('utf-8'), self.compression_level)
+            content = COMPRESSED_CONTENT_PREFIX + base64.b64encode(compressed).decode('ascii')
+
+        return content
+
+    def loads(self, content):
+        """
+        Deserializes the text stored in HarvestObject.content.
+
+        Args:
+            content (str or bytes): The JSON (or compressed JSON) text.
+
+        Returns:
+            any: The deserialized object.
+
+        Raises:
+            ValueError: If the content cannot be decompressed or parsed.
+        """
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+
+        if content.startswith(COMPRESSED_CONTENT_PREFIX):
+            try:
+                compressed = base64.b64decode(content[len(COMPRESSED_CONTENT_PREFIX):])
+                content = zlib.decompress(compressed).decode('utf-8')
+            except (binascii.Error, zlib.error) as e:
+                raise ValueError(f'Unable to decompress content: {e}') from e
+
+        return self._loads(content)
@@ -0,0 +1,390 @@
+import json
+import logging
+
+from collections import OrderedDict
+from threading import Lock
+
+try:
+    from shapely.geometry import mapping, shape
+    from shapely.ops import unary_union
+    SHAPELY_AVAILABLE = True
+except ImportError:
+    SHAPELY_AVAILABLE = False
+
+log = logging.getLogger(__name__)
+
+# Fields of the Solr document (before_index) with the spatial extents extracted from the resources
+SPATIAL_EXTENT_FIELDS = ('spatial_extent', 'extras_spatial_extent', 'res_extras_spatial_extent')
+
+WORLD_BBOX = (-180.0, -90.0, 180.0, 90.0)
+
+# Geometries stored in the `spatial` field for the selected `spatial_uri` choices:
+# the polygons of the choices, their simplified union or the bounding box of all of them
+SPATIAL_URI_GEOMETRY_FULL = 'full'
+SPATIAL_URI_GEOMETRY_SIMPLIFIED = 'simplified'
+SPATIAL_URI_GEOMETRY_BBOX = 'bbox'
+SPATIAL_URI_GEOMETRY_MODES = (SPATIAL_URI_GEOMETRY_FULL, SPATIAL_URI_GEOMETRY_SIMPLIFIED, SPATIAL_URI_GEOMETRY_BBOX)
+COMBINED_GEOMETRIES_MAXSIZE = 512
+# Maximum total length (characters) of the memoized combined geometries of a process. Longer
+# geometries than a fraction of it are not memoized.
+COMBINED_GEOMETRIES_MAX_CHARS = 16 * 1024 * 1024
+COMBINED_GEOMETRY_MAX_CHARS = COMBINED_GEOMETRIES_MAX_CHARS // 16
+
+# Combined geometries of the recent spatial_uri combinations, least recently used first, see combine_choice_geometries()
+_combined_geometries = OrderedDict()
+_combined_geometries_chars = 0
+_combined_geometries_lock = Lock()
+
+
+def _load_geojson(value):
+    """
+    Load a GeoJSON value, either a dict or a JSON string.
+
+    Returns:
+        dict: The GeoJSON object, or None if it is not valid.
+    """
+    if isinstance(value, dict):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return None
+    try:
+        geojson = json.loads(value)
+    except ValueError:
+        return None
+    return geojson if isinstance(geojson, dict) else None
+
+
+def _iter_geometries(geojson):
+    """
+    Yield the geometries of a GeoJSON Geometry, GeometryCollection, Feature or FeatureCollection.
+    """
+    geojson_type = geojson.get('type')
+    if geojson_type == 'FeatureCollection':
+        for feature in geojson.get('features') or []:
+            if isinstance(feature, dict):
+                yield from _iter_geometries(feature)
+    elif geojson_type == 'Feature':
+        geometry = geojson.get('geometry')
+        if isinstance(geometry, dict):
+            yield from _iter_geometries(geometry)
+    elif geojson_type == 'GeometryCollection':
+        for geometry in geojson.get('geometries') or []:
+            if isinstance(geometry, dict):
+                yield from _iter_geometries(geometry)
+    elif 'coordinates' in geojson:
+        yield geojson
+
+
+def _iter_positions(coordinates):
+    """
+    Yield the (x, y) positions of nested GeoJSON coordinates.
+    """
+    if not isinstance(coordinates, (list, tuple)) or not coordinates:
+        return
+    if isinstance(coordinates[0], (int, float)):
+        if len(coordinates) >= 2:
+            yield float(coordinates[0]), float(coordinates[1])
+        return
+    for item in coordinates:
+        yield from _iter_positions(item)
+
+
+def normalize_bbox(bbox):
+    """
+    Normalize a bounding box to WGS84 bounds, clamping it to the world extent.
+
+    Args:
+        bbox (tuple): The (minx, miny, maxx, maxy) bounding box.
+
+    Returns:
+        tuple: The normalized bounding box, or None if it is not valid.
+    """
+    minx, miny, maxx, maxy = bbox
+    minx, maxx = max(minx, WORLD_BBOX[0]), min(maxx, WORLD_BBOX[2])
+    miny, maxy = max(miny, WORLD_BBOX[1]), min(maxy, WORLD_BBOX[3])
+    if minx > maxx or miny > maxy:
+        return None
+    return minx, miny, maxx, maxy
+
+
+def geojson_bbox(value):
+    """
+    Compute the bounding box of a GeoJSON value in WGS84, e.g. the `spatial_extent` of a dataset or resource.
+
+    Args:
+        value (dict or str): The GeoJSON object or JSON string.
+
+    Returns:
+        tuple: The normalized (minx, miny, maxx, maxy) bounding box, or None if the value has no valid coordinates.
+    """
+    geojson = _load_geojson(value)
+    if not geojson:
+        return None
+
+    bbox = None
+    for geometry in _iter_geometries(geojson):
+        for x, y in _iter_positions(geometry.get('coordinates')):
+            if bbox is None:
+                bbox = [x, y, x, y]
+            else:
+                bbox[0], bbox[1] = min(bbox[0], x), min(bbox[1], y)
+                bbox[2], bbox[3] = max(bbox[2], x), max(bbox[3], y)
+
+    return normalize_bbox(bbox) if bbox else None
+
+
+def merge_bboxes(bboxes):
+    """
+    Compute the bounding box that contains all the given bounding boxes.
+
+    Args:
+        bboxes (iterable): The (minx, miny, maxx, maxy) bounding boxes. None values are ignored.
+
+    Returns:
+        tuple: The merged bounding box, or None if there are no bounding boxes.
+    """
+    bboxes = [bbox for bbox in bboxes if bbox]
+    if not bboxes:
+        return None
+    return (
+        min(bbox[0] for bbox in bboxes),
+        min(bbox[1] for bbox in bboxes),
+        max(bbox[2] for bbox in bboxes),
+        max(bbox[3] for bbox in bboxes),
+    )
+
+
+def bbox_to_envelope(bbox):
+    """
+    Convert a bounding box to the `ENVELOPE(minx, maxx, maxy, miny)` syntax indexed by Solr BBoxField and RPT fields.
+
+    Args:
+        bbox (tuple): The (minx, miny, maxx, maxy) bounding box.
+
+    Returns:
+        str: The envelope.
+    """
+    minx, miny, maxx, maxy = bbox
+    return f'ENVELOPE({minx}, {maxx}, {maxy}, {miny})'
+
+
+def parse_bbox_param(value):
+    """
+    Parse a bounding box search parameter: `minx,miny,maxx,maxy` in WGS84.
+
+    Args:
+        value (str): The search parameter value.
+
+    Returns:
+        tuple: The normalized bounding box, or None if the value is not valid.
+    """
+    if not value:
+        return None
+    try:
+        bbox = tuple(float(coord) for coord in str(value).split(','))
+    except ValueError:
+        return None
+    if len(bbox) != 4:
+        return None
+    return normalize_bbox(bbox)
+
+
+def simplified_geometry_wkt(values, tolerance):
+    """
+    Build a simplified WKT geometry from the union of GeoJSON values, for Solr RPT fields.
+
+    Requires shapely. Returns None if it is not installed.
+
+    Args:
+        values (iterable): The GeoJSON objects or JSON strings.
+        tolerance (float): The simplification tolerance in degrees.
+
+    Returns:
+        str: The WKT of the simplified geometry, or None.
+    """
+    if not SHAPELY_AVAILABLE:
+        return None
+
+    geometry = None
+    for value in values:
+        geojson = _load_geojson(value)
+        if not geojson:
+            continue
+        for item in _iter_geometries(geojson):
+            try:
+                item_geometry = shape(item)
+            except Exception as e:
+                log.debug('Invalid geometry in spatial extent: %s', e)
+                continue
+            geometry = item_geometry if geometry is None else geometry.union(item_geometry)
+
+    if geometry is None or geometry.is_empty:
+        return None
+
+    return geometry.simplify(tolerance, preserve_topology=True).wkt
+
+
+def bbox_polygon(bbox):
+    """
+    Convert a bounding box to a GeoJSON Polygon.
+
+    Args:
+        bbox (tuple): The (minx, miny, maxx, maxy) bounding box.
+
+    Returns:
+        dict: The GeoJSON Polygon.
+    """
+    minx, miny, maxx, maxy = bbox
+    return {
+        "type": "Polygon",
+        "coordinates": [[[minx, miny], [maxx, miny], [maxx, maxy], [minx, maxy], [minx, miny]]]
+    }
+
+
+def merge_polygons(geometries):
+    """
+    Merge the coordinates of GeoJSON Polygons and MultiPolygons into a single geometry, without
+    computing their union.
+
+    Args:
+        geometries (iterable): The GeoJSON geometries. Other geometry types are ignored.
+
+    Returns:
+        dict: A Polygon if there is only one polygon, a MultiPolygon otherwise, or None if there are no polygons.
+    """
+    all_coordinates = []
+    for geometry in geometries:
+        if geometry.get('type') == 'Polygon':
+            all_coordinates.append(geometry['coordinates'])
+        elif geometry.get('type') == 'MultiPolygon':
+            all_coordinates.extend(geometry['coordinates'])
+
+    if not all_coordinates:
+        return None
+    if len(all_coordinates) == 1:
+        return {"type": "Polygon", "coordinates": all_coordinates[0]}
+    return {"type": "MultiPolygon", "coordinates": all_coordinates}
+
+
+def simplified_polygons_union(geometries, tolerance):
+    """
+    Compute the simplified union of GeoJSON Polygons and MultiPolygons.
+
+    Requires shapely. Returns None if it is not installed.
+
+    Args:
+        geometries (iterable): The GeoJSON geometries. Other geometry types are ignored.
+        tolerance (float): The simplification tolerance in degrees.
+
+    Returns:
+        dict: The GeoJSON geometry of the simplified union, or None.
+    """
+    if not SHAPELY_AVAILABLE:
+        return None
+
+    shapes = []
+    for geometry in geometries:
+        if geometry.get('type') not in ('Polygon', 'MultiPolygon'):
+            continue
+        try:
+            shapes.append(shape(geometry))
+        except Exception as e:
+            log.debug('Invalid spatial_uri geometry: %s', e)
+
+    if not shapes:
+        return None
+
+    union = unary_union(shapes)
+    if union.is_empty:
+        return None
+    if tolerance:
+        union = union.simplify(tolerance, preserve_topology=True)
+    return mapping(union)
+
+
+def combine_geometries(geometries, mode=SPATIAL_URI_GEOMETRY_FULL, tolerance=0.01, max_length=0):
+    """
+    Combine the GeoJSON polygons of the selected spatial_uri choices into the GeoJSON string stored in the `spatial` field.
+
+    Args:
+        geometries (list): The GeoJSON geometries of the choices.
+        mode (str, optional): 'full' to merge the polygons, 'simplified' to store their simplified union (requires shapely) or 'bbox' to store their bounding box. Defaults to 'full'.
+        tolerance (float, optional): The simplification tolerance in degrees. Defaults to 0.01.
+        max_length (int, optional): Maximum length of the GeoJSON string. Longer geometries are simplified and, if still too long, replaced by their bounding box. 0 for no limit.
+
+    Returns:
+        str: The GeoJSON string, or an empty string if there are no polygons.
+    """
+    geometry = merge_polygons(geometries)
+    if geometry is None:
+        return ''
+
+    if mode == SPATIAL_URI_GEOMETRY_SIMPLIFIED:
+        geometry = simplified_polygons_union(geometries, tolerance) or geometry
+    elif mode == SPATIAL_URI_GEOMETRY_BBOX:
+        bbox = geojson_bbox(geometry)
+        geometry = bbox_polygon(bbox) if bbox else geometry
+
+    value = json.dumps(geometry)
+    if not max_length or len(value) <= max_length or mode == SPATIAL_URI_GEOMETRY_BBOX:
+        return value
+
+    if mode == SPATIAL_URI_GEOMETRY_FULL:
+        simplified = simplified_polygons_union(geometries, tolerance)
+        if simplified is not None:
+            value = json.dumps(simplified)
+            if len(value) <= max_length:
+                return value
+
+    bbox = geojson_bbox(geometry)
+    return json.dumps(bbox_polygon(bbox)) if bbox else value
+
+
+def combine_choice_geometries(geometries, values, mode=SPATIAL_URI_GEOMETRY_FULL, tolerance=0.01, max_length=0):
+    """
+    Memoized `combine_geometries` of the geometries of a set of spatial_uri choices.
+
+    The least recently used geometries are evicted when the memo holds more than
+    `COMBINED_GEOMETRIES_MAXSIZE` geometries or `COMBINED_GEOMETRIES_MAX_CHARS` characters,
+    and geometries longer than `COMBINED_GEOMETRY_MAX_CHARS` are not memoized.
+
+    Args:
+        geometries (dict): The parsed GeoJSON geometry of each choice value, e.g. `ChoiceIndex.geometries`.
+        values (list): The selected choice values.
+        mode (str, optional): See `combine_geometries`. Defaults to 'full'.
+        tolerance (float, optional): See `combine_geometries`. Defaults to 0.01.
+        max_length (int, optional): See `combine_geometries`. Defaults to 0.
+
+    Returns:
+        str: The GeoJSON string, or an empty string if no choice has a polygon.
+    """
+    values = tuple(value for value in values if value in geometries)
+    if not values:
+        return ''
+
+    global _combined_geometries_chars
+
+    key = (id(geometries), values, mode, tolerance, max_length)
+    with _combined_geometries_lock:
+        entry = _combined_geometries.get(key)
+        # The entry keeps a reference to the geometries, so their id is not reused while it exists
+        if entry and entry[0] is geometries:
+            _combined_geometries.move_to_end(key)
+            return entry[1]
+
+    value = combine_geometries([geometries[value] for value in values], mode, tolerance, max_length)
+    if len(value) > COMBINED_GEOMETRY_MAX_CHARS:
+        return value
+
+    with _combined_geometries_lock:
+        previous = _combined_geometries.pop(key, None)
+        if previous:
+            _combined_geometries_chars -= len(previous[1])
+        while _combined_geometries and (
+            len(_combined_geometries) >= COMBINED_GEOMETRIES_MAXSIZE
+            or _combined_geometries_chars + len(value) > COMBINED_GEOMETRIES_MAX_CHARS
+        ):
+            _combined_geometries_chars -= len(_combined_geometries.popitem(last=False)[1][1])
+        _combined_geometries[key] = (geometries, value)
+        _combined_geometries_chars += len(value)
+    return value
@@ -3,12 +3,24 @@ import json
 import ckan.plugins as plugins
 import ckanext.schemingdcat.config as sdct_config
 import ckanext.schemingdcat.utils as utils
+from ckanext.schemingdcat.helpers import invalidate_harvest_source_cache
+from ckanext.schemingdcat.lib import cache
+from ckanext.schemingdcat.lib.choice_index import DYNAMIC_CHOICES_NAMESPACE
+from ckanext.schemingdcat.lib.fq_parser import decompose_fq_facet_filters, rewrite_fq_facet_operator
+from ckanext.schemingdcat.lib import spatial_index
+from ckanext.schemingdcat.lib.search_cache import search_page_cache
 
 import logging
 import sys
 
 FACET_OPERATOR_PARAM_NAME = '_facet_operator'
 FACET_SORT_PARAM_NAME = '_%s_sort'
+SPATIAL_BBOX_PARAM_NAME = 'ext_extent_bbox'
+# Namespaces of the memoized helpers cleared when a dataset changes. The choices of the
+# `choices_helper` fields are only cleared when a group or organization changes, otherwise
+# they expire after `schemingdcat.choices_cache_ttl` seconds.
+DATASET_CACHE_NAMESPACES = ('dataset', 'group', 'vocabulary')
+GROUP_CACHE_NAMESPACES = DATASET_CACHE_NAMESPACES + (DYNAMIC_CHOICES_NAMESPACE,)
 
 log = logging.getLogger(__name__)
 
@@ -22,11 +34,12 @@ class PackageController():
     def read(self, entity):
         pass
 
+    # create, edit and delete are also called for groups and organizations (IGroupController)
     def create(self, entity):
-        pass
+        self._invalidate_caches(entity)
 
     def edit(self, entity):
-        pass
+        self._invalidate_caches(entity)
 
     def authz_add_role(self, object_role):
         pass
@@ -35,12 +48,27 @@ class PackageController():
         pass
 
     def delete(self, entity):
-        pass
+        self._invalidate_caches(entity)
+
+    @staticmethod
+    def _invalidate_caches(entity):
+        """Clears the caches that depend on a dataset, group or organization that has changed.
+
+        Args:
+            entity (object): The changed dataset, group or organization.
+        """
+        if hasattr(entity, 'is_organization'):
+            cache.invalidate(*GROUP_CACHE_NAMESPACES)
+            # The search pages of datasets are invalidated once per write by the after_* hooks
+            search_page_cache.bump_version()
+        else:
+            cache.invalidate(*DATASET_CACHE_NAMESPACES)
+        invalidate_harvest_source_cache()
 
     def before_search(self, search_params):
         """Modifies search parameters before executing a search.
 
-        This method adjusts the 'fq' (filter query) parameter based on the 'facet.field' value in the search parameters. If 'facet.field' is a list, it iterates through each field, applying the '_facet_search_operator' to modify 'fq'. If 'facet.field' is a string, it directly applies the '_facet_search_operator'. If 'facet.field' is not present or is invalid, no modification is made.
+        This method adjusts the 'fq' (filter query) parameter based on the 'facet.field' value in the search parameters. With the OR facet operator and `schemingdcat.facet_filter_tags` enabled, the facet filters are moved to separate tagged 'fq_list' filters (see '_facet_filter_tags'). Otherwise, the 'facet.field' value (a list or a single field name) is passed to '_facet_search_operator' to rewrite 'fq' in a single pass. If 'facet.field' is not present or is invalid, no modification is made.
 
         Args:
             search_params (dict): The search parameters to be modified. Expected to contain 'facet.field' and 'fq'.
@@ -52,15 +80,17 @@ class PackageController():
             Exception: Captures and logs any exception that occurs during the modification of search parameters.
         """
         try:
+            self._spatial_bbox_filter(search_params)
+
             facet_field = search_params.get('facet.field', '')
             if not facet_field:
                 return search_params
-            elif isinstance(facet_field, list):
-                for field in facet_field:
-                    new_fq = self._facet_search_operator(search_params.get('fq', ''), field)
-                    if new_fq and isinstance(new_fq, str):
-                        search_params.update({'fq': new_fq})
             elif isinstance(facet_field, str):
+                facet_field = [facet_field]
+
+            if isinstance(facet_field, list) and sdct_config.facet_filter_tags and self._get_facet_operator() == 'OR':
+                self._facet_filter_tags(search_params, facet_field)
+            elif isinstance(facet_field, list):
                 new_fq = self._facet_search_operator(search_params.get('fq', ''), facet_field)
                 if new_fq and isinstance(new_fq, str):
                     search_params.update({'fq': new_fq})
@@ -74,7 +104,11 @@ class PackageController():
     def before_index(self, data_dict):
         """Processes the data dictionary before indexing.
 
-        Iterates through each facet defined in the system's facets dictionary. For each facet present in the data dictionary, it attempts to parse its value as JSON. If the value is a valid JSON string, it replaces the original string value with the parsed JSON object. If the value cannot be parsed as JSON (e.g., because it's not a valid JSON string), it leaves the value unchanged. Facets present in the data dictionary but not containing any data are removed.
+        Parses the values of the schema fields stored as JSON lists (e.g. multiple_choice or multiple_text fields, see `utils.get_json_list_fields`), replacing the JSON strings with the parsed objects. If a value cannot be parsed as JSON, it is left unchanged. Facets present in the data dictionary but not containing any data are removed.
+
+        The JSON fields are computed once per process from the schema, so the rest of the fields are not parsed on every indexed package, e.g. on a `search-index rebuild`.
+
+        The bounding box of the spatial extents is added for spatial filtering (see `_index_spatial_extent`). Finally, the fields marked with the `index` key in the schema are projected out of the document (see `_project_index_fields`).
 
         Args:
             data_dict (dict): The data dictionary to be processed. It's expected to contain keys corresponding to facet names with their associated data as values.
@@ -82,11 +116,12 @@ class PackageController():
         Returns:
             dict: The processed data dictionary with JSON strings parsed into objects where applicable and empty facets removed.
         """
-        for facet, label in utils.get_facets_dict().items():
+        json_list_fields = utils.get_json_list_fields()
+        for facet in utils.get_facets_dict():
             data = data_dict.get(facet)
             #log.debug("[before_index] Data ({1}) in facet: {0}".format(data, facet))
             if data:
-                if isinstance(data, str):
+                if facet in json_list_fields and isinstance(data, str) and data[:1] in ('[', '{'):
                     try:
                         data_dict[facet] = json.loads(data)
                     except json.decoder.JSONDecodeError:
@@ -95,9 +130,75 @@ class PackageController():
                 if facet in data_dict:
                     del data_dict[facet]
 
+        self._index_spatial_extent(data_dict)
+
+        return self._project_index_fields(data_dict)
+
+    def _index_spatial_extent(self, data_dict):
+        """Adds the bounding box of the spatial extents of the dataset and its resources to the Solr document.
+
+        If `schemingdcat.spatial_bbox_field` is set, the bounding box is indexed in that field (a Solr BBoxField or RPT field) as an `ENVELOPE`. If `schemingdcat.spatial_geometry_field` is set and shapely is installed, the simplified union of the extents is also indexed as WKT (a Solr RPT field).
+
+        Args:
+            data_dict (dict): The data dictionary to be indexed.
+
+        Returns:
+            dict: The data dictionary with the spatial fields.
+        """
+        bbox_field = sdct_config.spatial_bbox_field
+        geometry_field = sdct_config.spatial_geometry_field
+        if not bbox_field and not geometry_field:
+            return data_dict
+
+        extents = []
+        for field in spatial_index.SPATIAL_EXTENT_FIELDS:
+            value = data_dict.get(field)
+            if isinstance(value, list):
+                extents.extend(value)
+            elif value:
+                extents.append(value)
+
+        if not extents:
+            return data_dict
+
+        try:
+            bbox = spatial_index.merge_bboxes(spatial_index.geojson_bbox(extent) for extent in extents)
+            if bbox and bbox_field:
+                data_dict[bbox_field] = spatial_index.bbox_to_envelope(bbox)
+
+            if bbox and geometry_field:
+                geometry = spatial_index.simplified_geometry_wkt(extents, sdct_config.spatial_geometry_tolerance)
+                if geometry:
+                    data_dict[geometry_field] = geometry
+        except Exception as e:
+            log.error("[_index_spatial_extent] Error indexing the spatial extent of %s: %s", data_dict.get('id'), e)
+
+        return data_dict
+
+    def _project_index_fields(self, data_dict):
+        """Removes from the Solr document the fields that the schema does not index (see `utils.get_index_projection`).
+
+        Fields with `index: false` are removed, along with their `extras_*` and `res_extras_*` copies. Fields with `index: facet` only keep the field itself. The values are still available in the `data_dict` and `validated_data_dict` of the document.
+
+        Args:
+            data_dict (dict): The data dictionary to be indexed.
+
+        Returns:
+            dict: The data dictionary without the projected out fields.
+        """
+        for field, projection in utils.get_index_projection().items():
+            if projection == utils.INDEX_PROJECTION_NONE:
+                data_dict.pop(field, None)
+            data_dict.pop('extras_' + field, None)
+            data_dict.pop('res_extras_' + field, None)
+
         return data_dict
 
     def before_view(self, pkg_dict):
+        # Also called for groups and organizations (IGroupController)
+        if 'is_organization' in pkg_dict:
+            return pkg_dict
+
         # Asegurarnos de que el modo del formulario esté disponible
         if 'form_mode' not in pkg_dict:
             pkg_dict['form_mode'] = 'basic'
@@ -110,16 +211,19 @@ class PackageController():
         # Limpiar el modo del formulario si es necesario
         if 'form_mode' in data_dict:
             del data_dict['form_mode']
-        
+
+        search_page_cache.bump_version()
         return data_dict
 
     def after_update(self, context, data_dict):
         """
         Hook que se ejecuta después de actualizar un dataset.
         """
+        search_page_cache.bump_version()
         return data_dict
 
     def after_delete(self, context, data_dict):
+        search_page_cache.bump_version()
         return data_dict
 
     def after_show(self, context, data_dict):
@@ -131,42 +235,104 @@ class PackageController():
     def package_controller_config(self, default_facet_operator):
         self.default_facet_operator = default_facet_operator
 
-    def _facet_search_operator(self, fq, facet_field):
-        """Modifies the query filter (fq) to use the OR operator among the specified facet filters.
+    def _spatial_bbox_filter(self, search_params):
+        """Adds a filter by the bounding box of the spatial extents from the `ext_extent_bbox` search parameter (`minx,miny,maxx,maxy` in WGS84).
+
+        The filter is an indexed `Intersects` query on the `schemingdcat.spatial_bbox_field` field.
 
         Args:
-            fq (str): The current query filter.
-            facet_field (list): List of facet fields to consider for the OR operation.
+            search_params (dict): The search parameters to be modified.
 
         Returns:
-            str: The modified query filter.
+            dict: The modified search parameters.
         """
-        new_fq = fq
+        bbox_field = sdct_config.spatial_bbox_field
+        extras = search_params.get('extras') or {}
+        if not bbox_field or not extras.get(SPATIAL_BBOX_PARAM_NAME):
+            return search_params
+
+        bbox = spatial_index.parse_bbox_param(extras[SPATIAL_BBOX_PARAM_NAME])
+        if not bbox:
+            log.debug("[_spatial_bbox_filter] Invalid bounding box: %s", extras[SPATIAL_BBOX_PARAM_NAME])
+            return search_params
+
+        search_params['fq_list'] = list(search_params.get('fq_list') or []) + [
+            f'{{!field f={bbox_field}}}Intersects({spatial_index.bbox_to_envelope(bbox)})'
+        ]
+
+        return search_params
+
+    def _get_facet_operator(self):
+        """Returns the facet operator (AND/OR) of the current request, or the default one.
+
+        Returns:
+            str: The facet operator.
+        """
+        facet_operator = self.default_facet_operator
         try:
-            facet_operator = self.default_facet_operator
             # Determine the facet operator based on request parameters
             if request.params.get(FACET_OPERATOR_PARAM_NAME) == 'OR':
                 facet_operator = 'OR'
             elif request.params.get(FACET_OPERATOR_PARAM_NAME) == 'AND':
                 facet_operator = 'AND'
+        except RuntimeError:
+            # Outside of a request, e.g. searches from the CLI or background jobs
+            pass
+
+        return facet_operator
+
+    def _facet_filter_tags(self, search_params, facet_field):
+        """Moves the facet filters of the query filter (fq) to one 'fq_list' filter per facet field.
+
+        Each filter joins the values selected for its facet with OR and is tagged (`{!tag=...}`), so Solr caches it on its own and reuses it across searches with overlapping facet selections. The tagged filters are excluded (`{!ex=...}`) from the counts of their facet field, which keeps the counts of OR facets correct (multi-select faceting).
+
+        Args:
+            search_params (dict): The search parameters to be modified.
+            facet_field (list): List of facet fields to consider.
 
-            if facet_operator == 'OR' and facet_field:
-                # Split the original fq into conditions, assuming they are separated by " AND "
-                conditions = fq.split(' AND ')
-                # Filter and group conditions that correspond to facet fields
-                facet_conditions = [cond for cond in conditions if any(fld in cond for fld in facet_field)]
-                non_facet_conditions = [cond for cond in conditions if not any(fld in cond for fld in facet_field)]
-                # Reconstruct fq using " OR " to join facet conditions and " AND " for the rest
-                if facet_conditions:
-                    new_fq = ' OR '.join(facet_conditions)
-                    if non_facet_conditions:
-                        new_fq = f"({new_fq}) AND {' AND '.join(non_facet_conditions)}"
-                else:
-                    new_fq = ' AND '.join(non_facet_conditions)
+        Returns:
+            dict: The modified search parameters.
+        """
+        fq = search_params.get('fq', '')
+        if not fq:
+            return search_params
+
+        new_fq, facet_filters = decompose_fq_facet_filters(fq, tuple(facet_field))
+        if not facet_filters:
+            return search_params
+
+        excluded_tags = {field: tag for field, tag, _ in facet_filters}
+        search_params['fq'] = new_fq
+        search_params['fq_list'] = list(search_params.get('fq_list') or []) + [
+            facet_filter for _, _, facet_filter in facet_filters
+        ]
+        search_params['facet.field'] = [
+            f'{{!ex={excluded_tags[field]}}}{field}' if field in excluded_tags else field
+            for field in facet_field
+        ]
+
+        return search_params
+
+    def _facet_search_operator(self, fq, facet_field):
+        """Modifies the query filter (fq) to use the OR operator among the values selected for each facet field.
+
+        The query filter is parsed once and the conditions of each facet field are grouped into an OR clause, while the different facets and the rest of conditions are still required. The result is memoized per distinct fq.
+
+        Args:
+            fq (str): The current query filter.
+            facet_field (list): List of facet fields to consider for the OR operation.
+
+        Returns:
+            str: The modified query filter.
+        """
+        new_fq = fq
+        try:
+            if self._get_facet_operator() == 'OR' and facet_field and fq:
+                new_fq = rewrite_fq_facet_operator(fq, tuple(facet_field))
 
         except Exception as e:
             log.error("[_facet_search_operator] Error modifying the query filter: %s", e)
             # In case of error, return the original fq
             new_fq = fq
 
-        return new_fq
\ No newline at end of file
+        return new_fq
@@ -17,6 +17,12 @@ import ckanext.schemingdcat.cli as cli
 import ckanext.schemingdcat.config as sdct_config
 from ckanext.schemingdcat.faceted import Faceted
 from ckanext.schemingdcat.utils import init_config
+from ckanext.schemingdcat.lib.spatial_index import (
+    SHAPELY_AVAILABLE,
+    SPATIAL_URI_GEOMETRY_FULL,
+    SPATIAL_URI_GEOMETRY_MODES,
+    SPATIAL_URI_GEOMETRY_SIMPLIFIED,
+)
 from ckanext.schemingdcat.package_controller import PackageController
 from ckanext.schemingdcat import helpers, validators, logic, blueprint, views
 
@@ -33,6 +39,7 @@ class SchemingDCATPlugin(
     plugins.implements(plugins.ITemplateHelpers)
     plugins.implements(plugins.IFacets)
     plugins.implements(plugins.IPackageController)
+    plugins.implements(plugins.IGroupController, inherit=True)
     plugins.implements(plugins.ITranslation)
     plugins.implements(plugins.IValidators)
     plugins.implements(plugins.IBlueprint)
@@ -56,10 +63,70 @@ class SchemingDCATPlugin(
             "schemingdcat.default_facet_operator", sdct_config.default_facet_operator
         )
 
+        sdct_config.facet_filter_tags = toolkit.asbool(
+            config_.get(
+                "schemingdcat.facet_filter_tags", sdct_config.facet_filter_tags
+            )
+        )
+
+        sdct_config.spatial_bbox_field = config_.get(
+            "schemingdcat.spatial_bbox_field", sdct_config.spatial_bbox_field
+        )
+
+        sdct_config.spatial_geometry_field = config_.get(
+            "schemingdcat.spatial_geometry_field", sdct_config.spatial_geometry_field
+        )
+
+        sdct_config.spatial_geometry_tolerance = float(
+            config_.get(
+                "schemingdcat.spatial_geometry_tolerance", sdct_config.spatial_geometry_tolerance
+            )
+        )
+
+        sdct_config.spatial_uri_geometry = config_.get(
+            "schemingdcat.spatial_uri_geometry", sdct_config.spatial_uri_geometry
+        )
+        if sdct_config.spatial_uri_geometry not in SPATIAL_URI_GEOMETRY_MODES:
+            log.warning(
+                "Invalid schemingdcat.spatial_uri_geometry: %s. Using 'full'",
+                sdct_config.spatial_uri_geometry,
+            )
+            sdct_config.spatial_uri_geometry = SPATIAL_URI_GEOMETRY_FULL
+
+        sdct_config.spatial_uri_tolerance = float(
+            config_.get(
+                "schemingdcat.spatial_uri_tolerance", sdct_config.spatial_uri_tolerance
+            )
+        )
+
+        sdct_config.spatial_uri_max_length = toolkit.asint(
+            config_.get(
+                "schemingdcat.spatial_uri_max_length", sdct_config.spatial_uri_max_length
+            )
+        )
+        if not SHAPELY_AVAILABLE:
+            if sdct_config.spatial_uri_geometry == SPATIAL_URI_GEOMETRY_SIMPLIFIED:
+                log.warning(
+                    "schemingdcat.spatial_uri_geometry is 'simplified' but shapely is not installed. "
+                    "The spatial_uri geometries will be stored without simplification"
+                )
+            if sdct_config.spatial_uri_max_length > 0:
+                log.warning(
+                    "schemingdcat.spatial_uri_max_length is set but shapely is not installed. "
+                    "The spatial_uri geometries longer than %s characters will be replaced by their bounding box",
+                    sdct_config.spatial_uri_max_length,
+                )
+
         sdct_config.icons_dir = config_.get(
             "schemingdcat.icons_dir", sdct_config.icons_dir
         )
 
+        sdct_config.public_assets_refresh_interval = toolkit.asint(
+            config_.get(
+                "schemingdcat.public_assets_refresh_interval", sdct_config.public_assets_refresh_interval
+            )
+        )
+
         sdct_config.organization_custom_facets = toolkit.asbool(
             config_.get(
                 "schemingdcat.organization_custom_facets",
@@ -97,6 +164,30 @@ class SchemingDCATPlugin(
             "schemingdcat.endpoints_yaml", sdct_config.endpoints_yaml
             ) or sdct_config.endpoints_yaml
 
+        sdct_config.harvest_source_cache_ttl = toolkit.asint(
+            config_.get(
+                "schemingdcat.harvest_source_cache_ttl", sdct_config.harvest_source_cache_ttl
+            )
+        )
+
+        sdct_config.helpers_cache_ttl = toolkit.asint(
+            config_.get(
+                "schemingdcat.helpers_cache_ttl", sdct_config.helpers_cache_ttl
+            )
+        )
+
+        sdct_config.choices_cache_ttl = toolkit.asint(
+            config_.get(
+                "schemingdcat.choices_cache_ttl", sdct_config.choices_cache_ttl
+            )
+        )
+
+        sdct_config.search_cache_ttl = toolkit.asint(
+            config_.get(
+                "schemingdcat.search_cache_ttl", sdct_config.search_cache_ttl
+            )
+        )
+
         sdct_config.debug = toolkit.asbool(config_.get("debug", sdct_config.debug))
 
         # Default value use local ckan instance with /csw
@@ -2,21 +2,215 @@
 import random
 import time
 import hashlib
+from collections import namedtuple
 from datetime import datetime, timedelta
+from threading import Lock
 from flask import session
 import ckan.plugins.toolkit as toolkit
 
+try:
+    from ckan.lib.redis import connect_to_redis
+except ImportError:
+    connect_to_redis = None
+
 import logging
 log = logging.getLogger(__name__)
 
 
+# Prefix of the keys of the rate limiting counters in the store
+KEY_PREFIX = 'schemingdcat:ratelimit:'
+# Searches kept in the window after solving the captcha, to give the user more headroom
+SEARCHES_KEPT_AFTER_CAPTCHA = 5
+# Seconds to answer a captcha
+CAPTCHA_TTL = 300
+# Seconds to wait before connecting again to the store after an error
+STORE_RETRY_INTERVAL = 30
+
+
+class RateLimitVerdict(namedtuple('RateLimitVerdict', ['rate_limited', 'needs_captcha', 'remaining', 'searches'])):
+    """
+    The rate limiting decision for a search of an unauthenticated user.
+
+    Attributes:
+        rate_limited (bool): Whether the search must be blocked until the captcha is solved.
+        needs_captcha (bool): Whether the captcha is required.
+        remaining (int): The searches remaining before the captcha is required.
+        searches (float): The estimated searches of the client in the time window.
+    """
+    __slots__ = ()
+
+
+class MemoryRateLimitStore:
+    """In-process store of the rate limiting counters.
+
+    Used when Redis is not available and in tests. The counters are not shared between web workers.
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = Lock()
+
+    def _get(self, key, now):
+        item = self._data.get(key)
+        if item is None:
+            return 0
+        expires, value = item
+        if expires < now:
+            del self._data[key]
+            return 0
+        return value
+
+    def _set(self, key, value, ttl, now):
+        self._data[key] = (now + ttl, value)
+        if len(self._data) > self.maxsize:
+            for expired_key in [k for k, (expires, _) in self._data.items() if expires < now]:
+                del self._data[expired_key]
+            # Drop the oldest keys if the store is still full
+            while len(self._data) > self.maxsize:
+                del self._data[next(iter(self._data))]
+
+    def hit(self, key, ttl, *keys):
+        """Increment a counter and get it with the values of other keys, e.g. the previous counter.
+
+        Returns:
+            tuple: The incremented counter and the list of values of the other keys.
+        """
+        now = time.time()
+        with self._lock:
+            current = self._get(key, now) + 1
+            self._set(key, current, ttl, now)
+            return current, [self._get(other_key, now) for other_key in keys]
+
+    def incr(self, key, ttl):
+        now = time.time()
+        with self._lock:
+            value = self._get(key, now) + 1
+            self._set(key, value, ttl, now)
+            return value
+
+    def get_many(self, *keys):
+        now = time.time()
+        with self._lock:
+            return [self._get(key, now) for key in keys]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._set(key, value, ttl, time.time())
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class RedisRateLimitStore:
+    """Redis store of the rate limiting counters, shared by all the web workers."""
+
+    def __init__(self, redis):
+        self._redis = redis
+
+    def hit(self, key, ttl, *keys):
+        pipe = self._redis.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, ttl)
+        if keys:
+            pipe.mget(keys)
+        results = pipe.execute()
+        values = [int(value or 0) for value in results[2]] if keys else []
+        return int(results[0]), values
+
+    def incr(self, key, ttl):
+        pipe = self._redis.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, ttl)
+        return int(pipe.execute()[0])
+
+    def get_many(self, *keys):
+        return [int(value or 0) for value in self._redis.mget(keys)]
+
+    def set(self, key, value, ttl):
+        self._redis.setex(key, ttl, value)
+
+    def delete(self, *keys):
+        self._redis.delete(*keys)
+
+
 class RateLimiter:
-    """Rate limiter with simple math captcha for unauthenticated users."""
+    """Rate limiter with simple math captcha for unauthenticated users.
+
+    The searches of each client are counted in a server-side store (Redis, or the memory of the
+    process if Redis is not available) with a sliding window counter: the count of the current
+    fixed window plus the count of the previous one weighted by the part of it that is still
+    inside the sliding window. Each request costs O(1) and the counters are not stored in the
+    session, so clients cannot reset them by dropping their cookies.
+
+    The limiter fails open: while the store is not available, searches are allowed, and the
+    connection to Redis is retried every `STORE_RETRY_INTERVAL` seconds.
+    """
     
-    def __init__(self):
-        self.search_limit = toolkit.config.get('schemingdcat.search_rate_limit', 10)
-        self.time_window = toolkit.config.get('schemingdcat.search_time_window', 300)  # 5 minutes
-        self.captcha_required_after = toolkit.config.get('schemingdcat.captcha_after_searches', 10)
+    def __init__(self, store=None):
+        self.search_limit = toolkit.asint(toolkit.config.get('schemingdcat.search_rate_limit', 10))
+        self.time_window = toolkit.asint(toolkit.config.get('schemingdcat.search_time_window', 300))  # 5 minutes
+        self.captcha_required_after = toolkit.asint(toolkit.config.get('schemingdcat.captcha_after_searches', 10))
+        self.backend = toolkit.config.get('schemingdcat.rate_limit_backend', 'redis')
+        self._store = store
+        self._store_lock = Lock()
+        self._store_retry_at = 0
+
+    @property
+    def store(self):
+        """The store of the counters, created on first use, or None while it is not available."""
+        if self._store is None and time.monotonic() >= self._store_retry_at:
+            with self._store_lock:
+                if self._store is None and time.monotonic() >= self._store_retry_at:
+                    self._store = self._create_store()
+                    if self._store is None:
+                        self._store_retry_at = time.monotonic() + STORE_RETRY_INTERVAL
+        return self._store
+
+    def _create_store(self):
+        """Create the store of the counters.
+
+        Returns:
+            The Redis store, the memory store if the backend is 'memory' or Redis is not installed, or None if Redis cannot be reached.
+        """
+        if self.backend != 'redis' or connect_to_redis is None:
+            return MemoryRateLimitStore()
+        try:
+            redis = connect_to_redis()
+            redis.ping()
+            return RedisRateLimitStore(redis)
+        except Exception as e:
+            log.warning('Redis not available for the rate limiter, allowing searches until it is reachable: %s', e)
+            return None
+
+    def _call_store(self, operation, *args, default=None):
+        """Call an operation of the store, failing open.
+
+        If the store is not available or the operation fails, the error is logged, the default
+        value is returned and the store is created again after `STORE_RETRY_INTERVAL` seconds.
+
+        Args:
+            operation (str): The name of the store method, e.g. 'hit'.
+            *args: The arguments of the operation.
+            default (any, optional): The value returned if the operation cannot be done.
+
+        Returns:
+            any: The result of the operation, or the default value.
+        """
+        store = self.store
+        if store is None:
+            return default
+        try:
+            return getattr(store, operation)(*args)
+        except Exception as e:
+            log.warning('Rate limiter store error, allowing the search: %s', e)
+            with self._store_lock:
+                if self._store is store:
+                    self._store = None
+                    self._store_retry_at = time.monotonic() + STORE_RETRY_INTERVAL
+            return default
         
     def _get_session_key(self, prefix='search'):
         """Generate a session key for tracking."""
@@ -28,70 +222,108 @@ class RateLimiter:
         ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.environ.get('REMOTE_ADDR', ''))
         user_agent = request.environ.get('HTTP_USER_AGENT', '')
         return hashlib.md5(f"{ip}:{user_agent}".encode()).hexdigest()
+
+    def _get_keys(self, client_id=None, now=None):
+        """Get the store keys of a client for the current time.
+
+        Returns:
+            tuple: The keys of the current and previous window counters, the captcha flag and the failed captcha attempts, and the elapsed part of the current window (0 to 1).
+        """
+        client_id = client_id or self._get_client_identifier()
+        now = time.time() if now is None else now
+        window = max(1, self.time_window)
+        index, elapsed = divmod(now, window)
+        prefix = f'{KEY_PREFIX}{client_id}:'
+        return (
+            f'{prefix}{int(index)}',
+            f'{prefix}{int(index) - 1}',
+            f'{prefix}captcha',
+            f'{prefix}failed',
+            elapsed / window,
+        )
+
+    @staticmethod
+    def _estimate(current, previous, elapsed):
+        """Estimate the searches in the sliding window from the counters of the fixed windows."""
+        return current + previous * (1 - elapsed)
+
+    def _get_tracking(self):
+        """Get the search count, captcha flag and failed captcha attempts of the current client."""
+        key, previous_key, captcha_key, failed_key, elapsed = self._get_keys()
+        current, previous, captcha_required, failed_attempts = self._call_store(
+            'get_many', key, previous_key, captcha_key, failed_key, default=[0, 0, 0, 0]
+        )
+        return {
+            'searches': self._estimate(current, previous, elapsed),
+            'captcha_required': bool(captcha_required),
+            'captcha_failed_attempts': failed_attempts,
+        }
     
     def track_search(self):
-        """Track a search request for the current session."""
-        key = self._get_session_key()
-        current_time = time.time()
-        
-        # Initialize or get existing tracking data
-        if key not in session:
-            session[key] = {
-                'searches': [],
-                'captcha_required': False,
-                'captcha_failed_attempts': 0
-            }
-        
-        tracking = session[key]
-        
-        # Remove old searches outside the time window
-        tracking['searches'] = [
-            timestamp for timestamp in tracking['searches']
-            if current_time - timestamp < self.time_window
-        ]
-        
-        # Add current search
-        tracking['searches'].append(current_time)
-        
+        """Track a search request for the current client."""
+        verdict = self.check_search()
+        return {
+            'searches': verdict.searches,
+            'captcha_required': verdict.needs_captcha,
+        }
+
+    def check_search(self):
+        """Track a search request of the current client and decide if it is rate limited, in a single call.
+
+        The counters are updated with one request to the store, and the flag that requires the
+        captcha is only written when it changes. Nothing is written in the session. If the store
+        is not available, the search is allowed.
+
+        Returns:
+            RateLimitVerdict: The decision for the search.
+        """
+        key, previous_key, captcha_key, failed_key, elapsed = self._get_keys()
+        ttl = 2 * max(1, self.time_window)
+        result = self._call_store('hit', key, ttl, previous_key, captcha_key)
+        if result is None:
+            return RateLimitVerdict(
+                rate_limited=False,
+                needs_captcha=False,
+                remaining=self.captcha_required_after,
+                searches=0,
+            )
+        current, (previous, captcha_flag) = result
+        searches = self._estimate(current, previous, elapsed)
+
         # Check if captcha should be required
-        if len(tracking['searches']) >= self.captcha_required_after:
-            tracking['captcha_required'] = True
-        
-        session[key] = tracking
-        session.modified = True
-        
-        return tracking
+        captcha_required = bool(captcha_flag)
+        if not captcha_required and searches >= self.captcha_required_after:
+            self._call_store('set', captcha_key, 1, ttl)
+            captcha_required = True
+
+        return RateLimitVerdict(
+            rate_limited=searches > self.search_limit and captcha_required,
+            needs_captcha=captcha_required,
+            remaining=max(0, self.captcha_required_after - int(searches)),
+            searches=searches,
+        )
     
     def is_rate_limited(self):
-        """Check if the current session is rate limited."""
-        key = self._get_session_key()
-        
-        if key not in session:
-            return False
-        
-        tracking = session.get(key, {})
-        current_time = time.time()
-        
-        # Count recent searches
-        recent_searches = [
-            timestamp for timestamp in tracking.get('searches', [])
-            if current_time - timestamp < self.time_window
-        ]
-        
-        # Check if rate limit exceeded
-        if len(recent_searches) > self.search_limit:
-            # Check if captcha is required and not solved
-            if tracking.get('captcha_required', False):
-                return True
-        
-        return False
+        """Check if the current client is rate limited."""
+        tracking = self._get_tracking()
+
+        # Rate limited if the limit is exceeded and the captcha is required and not solved
+        return tracking['searches'] > self.search_limit and tracking['captcha_required']
     
     def needs_captcha(self):
-        """Check if captcha is required for current session."""
-        key = self._get_session_key()
-        tracking = session.get(key, {})
-        return tracking.get('captcha_required', False)
+        """Check if captcha is required for the current client."""
+        return self._get_tracking()['captcha_required']
     
+    def get_captcha_question(self):
+        """Get the question of the captcha of the session if it has not expired, or generate a new one.
+
+        The session is only written when a new captcha is generated.
+        """
+        captcha_data = session.get(self._get_session_key('captcha'), {})
+        if captcha_data.get('question') and time.time() - captcha_data.get('generated_at', 0) <= CAPTCHA_TTL:
+            return captcha_data['question']
+        return self.generate_captcha()
+
     def generate_captcha(self):
         """Generate a simple math captcha."""
         operations = [
@@ -134,22 +366,21 @@ class RateLimiter:
             return False
         
         # Check if captcha is expired (5 minutes)
-        if time.time() - captcha_data.get('generated_at', 0) > 300:
+        if time.time() - captcha_data.get('generated_at', 0) > CAPTCHA_TTL:
             return False
         
         # Verify answer
         correct_answer = captcha_data.get('answer', '')
         is_correct = str(user_answer).strip() == correct_answer
         
+        key, previous_key, captcha_flag_key, failed_key, elapsed = self._get_keys()
         if is_correct:
             # Reset captcha requirement
-            search_key = self._get_session_key()
-            if search_key in session:
-                session[search_key]['captcha_required'] = False
-                session[search_key]['captcha_failed_attempts'] = 0
-                # Clear some old searches to give user more headroom
-                session[search_key]['searches'] = session[search_key]['searches'][-5:]
-                session.modified = True
+            current, previous = self._call_store('get_many', key, previous_key, default=[0, 0])
+            # Keep some searches to give the user more headroom
+            searches = min(int(self._estimate(current, previous, elapsed)), SEARCHES_KEPT_AFTER_CAPTCHA)
+            self._call_store('delete', previous_key, captcha_flag_key, failed_key)
+            self._call_store('set', key, searches, 2 * max(1, self.time_window))
             
             # Clear captcha from session
             if captcha_key in session:
@@ -157,19 +388,13 @@ class RateLimiter:
                 session.modified = True
         else:
             # Track failed attempts
-            search_key = self._get_session_key()
-            if search_key in session:
-                session[search_key]['captcha_failed_attempts'] = \
-                    session[search_key].get('captcha_failed_attempts', 0) + 1
-                session.modified = True
+            self._call_store('incr', failed_key, 2 * max(1, self.time_window))
         
         return is_correct
     
     def get_remaining_searches(self):
         """Get the number of searches remaining before captcha is required."""
-        key = self._get_session_key()
-        tracking = session.get(key, {})
-        current_searches = len(tracking.get('searches', []))
+        current_searches = int(self._get_tracking()['searches'])
         
         if current_searches >= self.captcha_required_after:
             return 0
@@ -177,7 +402,9 @@ class RateLimiter:
         return self.captcha_required_after - current_searches
     
     def reset_session(self):
-        """Reset rate limiting for current session (for testing)."""
+        """Reset rate limiting for current client (for testing)."""
+        key, previous_key, captcha_key, failed_key, _ = self._get_keys()
+        self._call_store('delete', key, previous_key, captcha_key, failed_key)
         for key in [self._get_session_key(), self._get_session_key('captcha')]:
             if key in session:
                 del session[key]
@@ -0,0 +1,88 @@
+"""
+Tests for lib/fq_parser.py.
+"""
+import pytest
+
+from ckanext.schemingdcat.lib.fq_parser import (
+    FQClause,
+    decompose_fq_facet_filters,
+    parse_fq,
+    rewrite_fq_facet_operator,
+)
+
+FACET_FIELDS = ('tags', 'res_format')
+
+
+def test_parse_flat_query():
+    assert parse_fq('tags:"Environment" +dataset_type:dataset -res_format:CSV') == (
+        FQClause('', 'tags', '"Environment"'),
+        FQClause('+', 'dataset_type', 'dataset'),
+        FQClause('-', 'res_format', 'CSV'),
+    )
+
+
+def test_parse_escaped_quotes_and_ranges():
+    assert parse_fq(r'tags:"say \"hi\" (now)" metadata_modified:[2020-01-01T00:00:00Z TO NOW]') == (
+        FQClause('', 'tags', r'"say \"hi\" (now)"'),
+        FQClause('', 'metadata_modified', '[2020-01-01T00:00:00Z TO NOW]'),
+    )
+
+
+def test_parse_drops_and_operators():
+    assert parse_fq('tags:a AND res_format:CSV && groups:b') == (
+        FQClause('', 'tags', 'a'),
+        FQClause('', 'res_format', 'CSV'),
+        FQClause('', 'groups', 'b'),
+    )
+
+
+@pytest.mark.parametrize('fq', [
+    'tags:a OR tags:b',
+    'tags:a || tags:b',
+    'tags:a NOT tags:b',
+    '!tags:a res_format:CSV',
+    '{!tag=sdct_tags}tags:a',
+    'tags:"unbalanced',
+    'tags:(a OR b',
+    'tags: a',
+    '+ tags:a',
+])
+def test_unsupported_queries_pass_through(fq):
+    assert parse_fq(fq) is None
+    assert rewrite_fq_facet_operator(fq, FACET_FIELDS) == fq
+    assert decompose_fq_facet_filters(fq, FACET_FIELDS) == (fq, ())
+
+
+@pytest.mark.parametrize('fq', [
+    '',
+    '(tags:a OR tags:b)',
+    '+dataset_type:dataset tags_en:"a"',
+])
+def test_queries_without_facet_clauses_pass_through(fq):
+    assert rewrite_fq_facet_operator(fq, FACET_FIELDS) == fq
+    assert decompose_fq_facet_filters(fq, FACET_FIELDS) == (fq, ())
+
+
+def test_rewrite_joins_the_values_of_each_facet_with_or():
+    fq = 'tags:"a" tags_en:"b" res_format:"CSV" tags:"c" +dataset_type:dataset'
+    assert rewrite_fq_facet_operator(fq, FACET_FIELDS) == (
+        '+(tags:"a" OR tags:"c") +tags_en:"b" +res_format:"CSV" +dataset_type:dataset'
+    )
+
+
+def test_rewrite_keeps_prefixed_clauses_and_groups():
+    fq = r'-tags:"x" tags:"say \"hi\"" (groups:a OR groups:b) tags:c'
+    assert rewrite_fq_facet_operator(fq, FACET_FIELDS) == (
+        r'-tags:"x" +(tags:"say \"hi\"" OR tags:c) +(groups:a OR groups:b)'
+    )
+
+
+def test_decompose_moves_facet_clauses_to_tagged_filters():
+    fq = 'tags:"a" tags_en:"b" res_format:"CSV" tags:"c" metadata_modified:[* TO NOW] -tags:"x"'
+    assert decompose_fq_facet_filters(fq, FACET_FIELDS) == (
+        '+tags_en:"b" +metadata_modified:[* TO NOW] -tags:"x"',
+        (
+            ('tags', 'sdct_tags', '{!tag=sdct_tags}(tags:"a" OR tags:"c")'),
+            ('res_format', 'sdct_res_format', '{!tag=sdct_res_format}res_format:"CSV"'),
+        ),
+    )
@@ -0,0 +1,135 @@
+"""
+Tests for rate_limiter.py, with the in-memory store of the counters.
+"""
+import types
+
+import pytest
+
+import ckanext.schemingdcat.rate_limiter as rate_limiter_module
+from ckanext.schemingdcat.rate_limiter import (
+    MemoryRateLimitStore,
+    RateLimiter,
+    SEARCHES_KEPT_AFTER_CAPTCHA,
+    STORE_RETRY_INTERVAL,
+)
+
+
+class FakeSession(dict):
+    modified = False
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+class FailingStore(MemoryRateLimitStore):
+    def hit(self, key, ttl, *keys):
+        raise ConnectionError('Connection reset by peer')
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(1000.0)
+    monkeypatch.setattr(rate_limiter_module, 'time', types.SimpleNamespace(time=clock.time, monotonic=clock.monotonic))
+    return clock
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(rate_limiter_module, 'session', session)
+    return session
+
+
+def _limiter(store=None, time_window=100, search_limit=10, captcha_after=10):
+    limiter = RateLimiter(store=store or MemoryRateLimitStore())
+    limiter.time_window = time_window
+    limiter.search_limit = search_limit
+    limiter.captcha_required_after = captcha_after
+    limiter._get_client_identifier = lambda: 'client'
+    return limiter
+
+
+def test_sliding_window_estimate(clock, session):
+    limiter = _limiter(captcha_after=100)
+
+    for _ in range(4):
+        verdict = limiter.check_search()
+    assert verdict.searches == 4
+
+    # Half of the next window: the 4 searches of the previous window count for a half
+    clock.now = 1150.0
+    verdict = limiter.check_search()
+    assert verdict.searches == 1 + 4 * 0.5
+
+    # Two windows later the old searches do not count anymore
+    clock.now = 1300.0
+    assert limiter.check_search().searches == 1
+    assert not session.modified
+
+
+def test_captcha_flag_transition(clock, session):
+    store = MemoryRateLimitStore()
+    writes = []
+    original_set = store.set
+    store.set = lambda key, value, ttl: writes.append(key) or original_set(key, value, ttl)
+    limiter = _limiter(store=store, search_limit=3, captcha_after=3)
+
+    verdicts = [limiter.check_search() for _ in range(5)]
+
+    assert [v.needs_captcha for v in verdicts] == [False, False, True, True, True]
+    assert [v.rate_limited for v in verdicts] == [False, False, False, True, True]
+    assert [v.remaining for v in verdicts] == [2, 1, 0, 0, 0]
+    # The flag is only written when it changes
+    assert len(writes) == 1
+    assert limiter.needs_captcha()
+    assert limiter.is_rate_limited()
+
+
+def test_verify_captcha_resets_searches(clock, session):
+    limiter = _limiter(search_limit=3, captcha_after=3)
+    for _ in range(12):
+        limiter.check_search()
+
+    limiter.generate_captcha()
+    answer = session[limiter._get_session_key('captcha')]['answer']
+
+    assert not limiter.verify_captcha('wrong')
+    assert limiter._get_tracking()['captcha_failed_attempts'] == 1
+
+    assert limiter.verify_captcha(answer)
+    tracking = limiter._get_tracking()
+    assert tracking['searches'] == SEARCHES_KEPT_AFTER_CAPTCHA
+    assert not tracking['captcha_required']
+    assert tracking['captcha_failed_attempts'] == 0
+    assert limiter._get_session_key('captcha') not in session
+
+    # The flag is required again after the next search over the limit
+    verdict = limiter.check_search()
+    assert verdict.searches == SEARCHES_KEPT_AFTER_CAPTCHA + 1
+    assert verdict.needs_captcha and verdict.rate_limited
+
+
+def test_store_errors_fail_open(clock, session):
+    limiter = _limiter(store=FailingStore(), search_limit=0, captcha_after=0)
+    created = []
+    limiter._create_store = lambda: created.append(True) or MemoryRateLimitStore()
+
+    verdict = limiter.check_search()
+    assert not verdict.rate_limited
+    assert not verdict.needs_captcha
+
+    # The store is not created again until the retry interval has passed
+    assert limiter.check_search().searches == 0
+    assert not created
+
+    clock.now += STORE_RETRY_INTERVAL
+    assert limiter.check_search().searches == 1
+    assert created
@@ -5,9 +5,9 @@ import logging
 import os
 import inspect
 import json
-import hashlib
 from threading import Lock
-from ckanext.dcat.utils import CONTENT_TYPES
+from ckanext.dcat.utils import CONTENT_TYPES, get_endpoint
+from ckanext.schemingdcat.lib.public_assets import PublicAssetIndex
 import yaml
 from yaml.loader import SafeLoader
 from pathlib import Path
@@ -20,12 +20,59 @@ except ImportError:
 log = logging.getLogger(__name__)
 
 _facets_dict = None
+_json_list_fields = None
+_index_projection = None
 _public_dirs = None
-_files_hash = []
-_dirs_hash = []
+_public_asset_index = None
+
+# Output validators of the scheming fields stored as JSON, e.g. multiple_choice or multiple_text fields
+JSON_OUTPUT_VALIDATORS = frozenset([
+    'scheming_multiple_choice_output',
+    'scheming_load_json',
+    'schemingdcat_multiple_choice_custom_tag_output',
+])
+
+# Values of the `index` key of the scheming fields: how each field is projected into the Solr document
+INDEX_PROJECTION_FULL = 'full'
+INDEX_PROJECTION_FACET = 'facet'
+INDEX_PROJECTION_NONE = 'none'
+INDEX_PROJECTION_VALUES = {
+    'true': INDEX_PROJECTION_FULL,
+    'full': INDEX_PROJECTION_FULL,
+    'index': INDEX_PROJECTION_FULL,
+    'facet': INDEX_PROJECTION_FACET,
+    'false': INDEX_PROJECTION_NONE,
+    'none': INDEX_PROJECTION_NONE,
+    'store': INDEX_PROJECTION_NONE,
+}
 
 _facets_dict_lock = Lock()
 _public_dirs_lock = Lock()
+_public_asset_index_lock = Lock()
+
+
+def _get_dataset_schema():
+    """Get the scheming schema of the dataset type.
+
+    Returns:
+        dict: The dataset schema, or None if it is not available.
+    """
+    try:
+        # Try to get the action
+        action = logic.get_action('scheming_dataset_schema_show')
+        return action({}, {'type': 'dataset'})
+    except KeyError:
+        # Action not available (e.g., in worker context)
+        # Try to import and register scheming actions
+        try:
+            from ckanext.scheming import logic as scheming_logic
+            # Register the action manually
+            logic._actions['scheming_dataset_schema_show'] = scheming_logic.scheming_dataset_schema_show
+            # Try again
+            return logic.get_action('scheming_dataset_schema_show')({}, {'type': 'dataset'})
+        except Exception:
+            # If still failing, return None to avoid breaking the worker
+            return None
 
 
 def get_facets_dict():
@@ -40,37 +87,87 @@ def get_facets_dict():
             if not _facets_dict:
                 _facets_dict = {}
 
-                try:
-                    # Try to get the action
-                    action = logic.get_action('scheming_dataset_schema_show')
-                    schema = action({}, {'type': 'dataset'})
-
+                schema = _get_dataset_schema()
+                if schema:
                     for item in schema['dataset_fields']:
                         _facets_dict[item['field_name']] = item['label']
 
                     for item in schema['resource_fields']:
                         _facets_dict[item['field_name']] = item['label']
-                except KeyError:
-                    # Action not available (e.g., in worker context)
-                    # Try to import and register scheming actions
-                    try:
-                        from ckanext.scheming import logic as scheming_logic
-                        # Register the action manually
-                        logic._actions['scheming_dataset_schema_show'] = scheming_logic.scheming_dataset_schema_show
-                        # Try again
-                        schema = logic.get_action('scheming_dataset_schema_show')({}, {'type': 'dataset'})
-                        
-                        for item in schema['dataset_fields']:
-                            _facets_dict[item['field_name']] = item['label']
-
-                        for item in schema['resource_fields']:
-                            _facets_dict[item['field_name']] = item['label']
-                    except Exception:
-                        # If still failing, return empty dict to avoid breaking the worker
-                        pass
 
     return _facets_dict
 
+def get_json_list_fields():
+    """Get the names of the fields defined in the scheming file whose values are stored as JSON lists (or objects), e.g. multiple_choice or multiple_text fields.
+
+    The fields are the ones with an output validator that loads JSON, see `JSON_OUTPUT_VALIDATORS`.
+
+    Returns:
+        frozenset: The names of the JSON fields.
+    """
+    global _json_list_fields
+    if _json_list_fields is None:
+        with _facets_dict_lock:
+            if _json_list_fields is None:
+                json_list_fields = set()
+
+                schema = _get_dataset_schema()
+                if not schema:
+                    # Do not cache, the schema may be available later
+                    return frozenset()
+
+                for item in schema['dataset_fields'] + schema['resource_fields']:
+                    output_validators = (item.get('output_validators') or '').split()
+                    if JSON_OUTPUT_VALIDATORS.intersection(output_validators):
+                        json_list_fields.add(item['field_name'])
+
+                _json_list_fields = frozenset(json_list_fields)
+
+    return _json_list_fields
+
+def get_index_projection():
+    """Get the fields defined in the scheming file that are not fully indexed in Solr, from the `index` key of each field:
+
+        * `true` (default): The field is indexed as usual.
+        * `facet`: Only the field itself is indexed, for filtering and faceting. The `extras_*` and `res_extras_*` copies used by the free text search are not.
+        * `false` (or `store`): The field is not indexed. It is only stored in the `data_dict` and `validated_data_dict` of the Solr document.
+
+    Returns:
+        dict: The projection (`INDEX_PROJECTION_FACET` or `INDEX_PROJECTION_NONE`) of each field that is not fully indexed.
+    """
+    global _index_projection
+    if _index_projection is None:
+        with _facets_dict_lock:
+            if _index_projection is None:
+                index_projection = {}
+
+                schema = _get_dataset_schema()
+                if not schema:
+                    # Do not cache, the schema may be available later
+                    return {}
+
+                for item in schema['dataset_fields'] + schema['resource_fields']:
+                    if 'index' not in item:
+                        continue
+                    projection = INDEX_PROJECTION_VALUES.get(str(item['index']).lower())
+                    if projection is None:
+                        log.warning("Invalid index value '%s' for the field '%s', it will be fully indexed", item['index'], item['field_name'])
+                    elif projection != INDEX_PROJECTION_FULL:
+                        index_projection[item['field_name']] = projection
+
+                _index_projection = index_projection
+
+    return _index_projection
+
+def reset_facets_dict():
+    """Clear the cached labels, JSON fields and index projection of the scheming fields, so they are read again from the schemas.
+    """
+    global _facets_dict, _json_list_fields, _index_projection
+    with _facets_dict_lock:
+        _facets_dict = None
+        _json_list_fields = None
+        _index_projection = None
+
 def get_public_dirs():
     """Get the list of public directories specified in the configuration file.
 
@@ -86,6 +183,26 @@ def get_public_dirs():
 
     return _public_dirs
 
+def get_public_asset_index():
+    """Get the index of the files and directories of the public directories, building it on the first call.
+
+    It is built on first use rather than in `init_config`, because the plugins loaded after this one add their public directories later.
+
+    Returns:
+        PublicAssetIndex: The public asset index.
+    """
+    global _public_asset_index
+
+    if _public_asset_index is None:
+        with _public_asset_index_lock:
+            if _public_asset_index is None:
+                _public_asset_index = PublicAssetIndex(
+                    get_public_dirs(),
+                    refresh_interval=sdct_config.public_assets_refresh_interval,
+                )
+
+    return _public_asset_index
+
 def public_file_exists(path):
     """Check if a file exists in the public directories specified in the configuration file.
 
@@ -95,20 +212,7 @@ def public_file_exists(path):
     Returns:
         bool: True if the file exists in one of the public directories, False otherwise.
     """
-    #log.debug("Check if exists: {0}".format(path))
-    file_hash = hashlib.sha512(path.encode('utf-8')).hexdigest()
-
-    if file_hash in _files_hash:
-        return True
-
-    public_dirs = get_public_dirs()
-    for i in range(len(public_dirs)):
-        public_path = os.path.join(public_dirs[i], path)
-        if os.path.isfile(public_path):
-            _files_hash.append(file_hash)
-            return True
-
-    return False
+    return get_public_asset_index().file_exists(path)
 
 def public_dir_exists(path):
     """Check if a directory exists in the public directories specified in the configuration file.
@@ -119,24 +223,166 @@ def public_dir_exists(path):
     Returns:
         bool: True if the directory exists in one of the public directories, False otherwise.
     """
-    dir_hash = hashlib.sha512(path.encode('utf-8')).hexdigest()
+    return get_public_asset_index().dir_exists(path)
 
-    if dir_hash in _dirs_hash:
-        return True
+def find_public_file(path, extensions):
+    """Find the first of several extensions for which a file exists in the public directories.
 
-    public_dirs = get_public_dirs()
-    for i in range(len(public_dirs)):
-        public_path = os.path.join(public_dirs[i], path)
-        if os.path.isdir(public_path):
-            _dirs_hash.append(dir_hash)
-            return True
+    Args:
+        path (str): The path of the file without extension.
+        extensions (list): The extensions to try, in order.
 
-    return False
+    Returns:
+        str: The path with the first existing extension, or None if none exists.
+    """
+    return get_public_asset_index().find_file(path, extensions)
 
 def init_config():
     sdct_config.linkeddata_links = _load_yaml('linkeddata_links.yaml')
     sdct_config.geometadata_links = _load_yaml('geometadata_links.yaml')
     sdct_config.endpoints = _load_yaml(sdct_config.endpoints_yaml)
+    compile_link_tables()
+
+def compile_link_tables():
+    """Compile the linked data, geospatial metadata and catalog endpoint tables from the codelists, so the helpers only have to add the dataset id on each request.
+    """
+    sdct_config.linkeddata_table = _compile_linked_data_table(sdct_config.linkeddata_links or {})
+    sdct_config.geometadata_table = _compile_geospatial_metadata_table(sdct_config.geometadata_links or {})
+    sdct_config.catalog_endpoints_table = _compile_catalog_endpoints_table(sdct_config.endpoints or {})
+
+def get_link_tables():
+    """Get the compiled link tables, compiling them if `init_config` has not been called yet.
+
+    Returns:
+        tuple: The linked data, geospatial metadata and catalog endpoint tables.
+    """
+    if sdct_config.linkeddata_table is None:
+        compile_link_tables()
+    return sdct_config.linkeddata_table, sdct_config.geometadata_table, sdct_config.catalog_endpoints_table
+
+def get_geospatial_endpoint(type="dataset"):
+    """Get geospatial base URI for CSW Endpoint.
+
+    Args:
+        type (str): The type of endpoint to return. Can be 'catalog' or 'dataset'.
+
+    Returns:
+        str: The base URI of the CSW Endpoint with the appropriate format.
+    """
+    try:
+        if sdct_config.geometadata_base_uri:
+            csw_uri = sdct_config.geometadata_base_uri
+
+        if (
+            sdct_config.geometadata_base_uri
+            and "/csw" not in sdct_config.geometadata_base_uri
+        ):
+            csw_uri = sdct_config.geometadata_base_uri.rstrip("/") + "/csw"
+        elif sdct_config.geometadata_base_uri == "":
+            csw_uri = "/csw"
+        else:
+            csw_uri = sdct_config.geometadata_base_uri.rstrip("/")
+    except:
+        csw_uri = "/csw"
+
+    if type == "catalog":
+        return csw_uri + "?service=CSW&version={version}&request=GetCapabilities"
+    else:
+        return (
+            csw_uri
+            + "?service=CSW&version={version}&request=GetRecordById&id={id}&elementSetName={element_set_name}&outputSchema={output_schema}&OutputFormat={output_format}"
+        )
+
+def _compile_linked_data_table(linkeddata_links):
+    """Build the linked data entries of each DCAT content type, without the dataset id.
+
+    Args:
+        linkeddata_links (dict): The linkeddata_links codelist.
+
+    Returns:
+        tuple: The linked data entries.
+    """
+    table = []
+    for name, content_type in CONTENT_TYPES.items():
+        link = linkeddata_links.get(name) or {}
+        table.append({
+            "name": name,
+            "display_name": link.get("display_name", content_type),
+            "format": link.get("format"),
+            "image_display_url": link.get("image_display_url"),
+            "endpoint_icon": link.get("endpoint_icon"),
+            "description": link.get("description") or f"Formats {content_type}",
+            "description_url": link.get("description_url"),
+            "endpoint": "dcat.read_dataset",
+        })
+    return tuple(table)
+
+def _compile_geospatial_metadata_table(geometadata_links):
+    """Build the CSW format entries, with the URL formatted except for the `{id}` placeholder.
+
+    Args:
+        geometadata_links (dict): The geometadata_links codelist.
+
+    Returns:
+        tuple: The geospatial metadata entries.
+    """
+    csw_uri = get_geospatial_endpoint("dataset")
+    table = []
+    for item in geometadata_links.get("csw_formats") or []:
+        table.append({
+            "name": item["name"],
+            "display_name": item["display_name"],
+            "format": item["format"],
+            "image_display_url": item["image_display_url"],
+            "endpoint_icon": item["endpoint_icon"],
+            "description": item["description"],
+            "description_url": item["description_url"],
+            "url": csw_uri.format(
+                output_format=item["output_format"],
+                version=item["version"],
+                element_set_name=item["element_set_name"],
+                output_schema=item["output_schema"],
+                id="{id}",
+            ),
+        })
+    return tuple(table)
+
+def _compile_catalog_endpoints_table(endpoints):
+    """Build the catalog endpoint entries.
+
+    Args:
+        endpoints (dict): The endpoints codelist.
+
+    Returns:
+        tuple: The catalog endpoint entries.
+    """
+    csw_uri = get_geospatial_endpoint("catalog")
+    table = []
+    for item in endpoints.get("catalog_endpoints") or []:
+        endpoint_type = item.get("type").lower()
+        table.append({
+            "name": item["name"],
+            "display_name": item["display_name"],
+            "format": item["format"],
+            "image_display_url": item["image_display_url"],
+            "endpoint_icon": item["endpoint_icon"],
+            "fa_icon": item["fa_icon"],
+            "description": item["description"],
+            "type": item["type"],
+            "profile": item["profile"],
+            "profile_label": item["profile_label"],
+            "endpoint": get_endpoint("catalog")
+            if endpoint_type == "lod"
+            else csw_uri.format(version=item["version"])
+            if endpoint_type == "ogc"
+            else None,
+            "endpoint_data": {
+                "_format": item["format"],
+                "_external": True,
+                "profiles": item["profile"],
+            },
+        })
+    return tuple(table)
 
 def is_yaml(file):
     """Check if a file has a YAML extension.
@@ -1,10 +1,9 @@
 import json
 import re
 import six
-import mimetypes
 
-import ckanext.scheming.helpers as sh
 import ckanext.schemingdcat.helpers as helpers
+import ckanext.schemingdcat.config as sdct_config
 import ckan.lib.helpers as h
 from urllib.parse import urlparse
 from ckantoolkit import (
@@ -29,6 +28,9 @@ from ckanext.fluent.validators import (
     BCP_47_LANGUAGE, fluent_text_output, scheming_language_text, LANG_SUFFIX)
 
 from ckanext.schemingdcat.utils import parse_json
+from ckanext.schemingdcat.lib.choice_index import get_choice_index
+from ckanext.schemingdcat.lib.format_matcher import guess_type
+from ckanext.schemingdcat.lib.spatial_index import combine_choice_geometries
 from ckanext.schemingdcat.config import (
     OGC2CKAN_HARVESTER_MD_CONFIG,
     mimetype_base_uri
@@ -68,10 +70,6 @@ def schemingdcat_multiple_choice(field, schema):
     2. a single string for single item selection in form submissions:
        "choice-a"
     """
-    static_choice_values = None
-    if 'choices' in field:
-        static_choice_order = [c['value'] for c in field['choices']]
-        static_choice_values = set(static_choice_order)
     def validator(key, data, errors, context):
         # if there was an error before calling our validator
         # don't bother with our validation
@@ -91,24 +89,17 @@ def schemingdcat_multiple_choice(field, schema):
                 raise StopOnError
         else:
             value = []
-        choice_values = static_choice_values
-        if not choice_values:
-            choice_order = [
-                choice['value']
-                for choice in sh.scheming_field_choices(field)
-            ]
-            choice_values = set(choice_order)
+        choice_index = get_choice_index(field)
         selected = set()
         for element in value:
-            if element in choice_values:
+            if element in choice_index.values:
                 selected.add(element)
                 continue
             errors[key].append(_('unexpected choice "%s"') % element)
 
         if not errors[key]:
             # Return as a JSON string list of values
-            data[key] = json.dumps([v for v in
-                (static_choice_order if static_choice_values else choice_order)
+            data[key] = json.dumps([v for v in choice_index.order
                 if v in selected], ensure_ascii=False)
 
             if field.get('required') and not selected:
@@ -666,10 +657,6 @@ def schemingdcat_multiple_choice_custom_tag_string(field, schema):
     2. a single string for single item selection in form submissions:
        "choice-a"
     """
-    static_choice_values = None
-    if 'choices' in field:
-        static_choice_order = [c['value'] for c in field['choices']]
-        static_choice_values = set(static_choice_order)
     def validator(key, data, errors, context):
         # if there was an error before calling our validator
         # don't bother with our validation
@@ -695,24 +682,17 @@ def schemingdcat_multiple_choice_custom_tag_string(field, schema):
                 raise StopOnError
         else:
             value = []
-        choice_values = static_choice_values
-        if not choice_values:
-            choice_order = [
-                choice['value']
-                for choice in sh.scheming_field_choices(field)
-            ]
-            choice_values = set(choice_order)
+        choice_index = get_choice_index(field)
         selected = set()
         for element in value:
-            if element in choice_values:
+            if element in choice_index.values:
                 selected.add(element)
                 continue
             errors[key].append(_('unexpected choice "%s"') % element)
 
         if not errors[key]:
             # Return as a comma-separated string of values
-            data[key] = ','.join([v for v in
-                (static_choice_order if static_choice_values else choice_order)
+            data[key] = ','.join([v for v in choice_index.order
                 if v in selected])
 
             if field.get('required') and not selected:
@@ -830,7 +810,7 @@ def schemingdcat_spatial_uri_validator(field, schema):
     """
     schema_data = helpers.schemingdcat_get_dataset_schema()
     spatial_uri_field = next((f for f in schema_data['dataset_fields'] if f['field_name'] == 'spatial_uri'), None)
-    choices = spatial_uri_field['choices'] if spatial_uri_field else []
+    geometries = get_choice_index(spatial_uri_field).geometries if spatial_uri_field else {}
 
     def validator(key, data, errors, context):
         if data[key] is missing or data[key] is None or data[key] == '':
@@ -838,37 +818,14 @@ def schemingdcat_spatial_uri_validator(field, schema):
             if not isinstance(spatial_uris, list):
                 spatial_uris = [spatial_uris] if spatial_uris else []
             
-            # Collect all polygon coordinates from selected spatial_uris
-            all_coordinates = []
-            for uri in spatial_uris:
-                choice = next((item for item in choices if item["value"] == uri), None)
-                if choice and 'spatial' in choice:
-                    try:
-                        geometry = json.loads(choice['spatial'])
-                        if geometry.get('type') == 'Polygon':
-                            all_coordinates.append(geometry['coordinates'])
-                        elif geometry.get('type') == 'MultiPolygon':
-                            all_coordinates.extend(geometry['coordinates'])
-                    except (json.JSONDecodeError, AttributeError):
-                        continue
-            
-            if all_coordinates:
-                if len(all_coordinates) == 1:
-                    # Si solo hay un conjunto de coordenadas, usar Polygon
-                    polygon = {
-                        "type": "Polygon",
-                        "coordinates": all_coordinates[0]
-                    }
-                    data[key] = json.dumps(polygon)
-                else:
-                    # Si hay múltiples conjuntos de coordenadas, usar MultiPolygon
-                    multi_polygon = {
-                        "type": "MultiPolygon",
-                        "coordinates": all_coordinates
-                    }
-                    data[key] = json.dumps(multi_polygon)
-            else:
-                data[key] = ''  # Establecer como cadena vacía en lugar de 'missing'
+            # Combine the polygons of the selected spatial_uris, memoized by combination
+            data[key] = combine_choice_geometries(
+                geometries,
+                [uri for uri in spatial_uris if isinstance(uri, str)],
+                mode=sdct_config.spatial_uri_geometry,
+                tolerance=sdct_config.spatial_uri_tolerance,
+                max_length=sdct_config.spatial_uri_max_length,
+            )
         else:
             # Si data[key] ya tiene un valor, no hacemos nada
             pass
@@ -884,7 +841,7 @@ def schemingdcat_if_empty_guess_format(field, schema):
     This function attempts to guess the format of a resource based on its URL.
     If the resource format is not provided or is missing, and the resource is not being updated,
     it tries to guess the format from the URL. If the URL is a valid URL (i.e., it has a scheme and a path),
-    it uses the mimetypes module to guess the format and encoding. If a mimetype is found, it is stored in the data
+    it uses the memoized `mimetypes` guess of `lib.format_matcher` to guess the format and encoding. If a mimetype is found, it is stored in the data
     dictionary and the format is set to the last part of the mimetype (after the '/'). If no mimetype is found,
     the format is set to the file extension of the URL.
 
@@ -911,7 +868,7 @@ def schemingdcat_if_empty_guess_format(field, schema):
             if parsed.scheme and not parsed.path:
                 return
 
-            mimetype, encoding = mimetypes.guess_type(url)
+            mimetype, encoding = guess_type(url)
             if mimetype:
                 data[key] = mimetype.split('/')[-1].upper()
                 data[key[:-1] + ('mimetype',)] = f"{mimetype_base_uri}/{mimetype}"
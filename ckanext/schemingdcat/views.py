@@ -1,14 +1,25 @@
 # encoding: utf-8
 import ckan.plugins.toolkit as toolkit
-from flask import Blueprint
+from flask import Blueprint, current_app, g, request, session
+from ckan.lib.i18n import get_lang
 from ckan.views.dataset import search as core_search
+import ckanext.schemingdcat.config as sdct_config
+from ckanext.schemingdcat.lib.search_cache import search_page_cache
 from ckanext.schemingdcat.rate_limiter import rate_limiter
 
+try:
+    from flask_wtf.csrf import generate_csrf
+except ImportError:
+    generate_csrf = None
+
 import logging
 log = logging.getLogger(__name__)
 
 dataset_rate_limit = Blueprint('dataset_rate_limit', __name__)
 
+# Stored in the cached search pages instead of the CSRF token of the request that rendered them
+CSRF_TOKEN_PLACEHOLDER = '__schemingdcat_csrf_token__'
+
 
 def search(package_type='dataset'):
     """
@@ -16,18 +27,17 @@ def search(package_type='dataset'):
     """
     # Check if user is authenticated
     if not toolkit.g.userobj:
-        # Track the search request
-        tracking = rate_limiter.track_search()
+        # Track the search request and check if it is rate limited, without writing the session
+        verdict = rate_limiter.check_search()
         
-        # Check if rate limited
-        if rate_limiter.is_rate_limited():
-            # Generate captcha if needed
+        if verdict.rate_limited:
+            # Reuse the captcha of the session if it has not expired
             captcha_question = None
-            if rate_limiter.needs_captcha():
-                captcha_question = rate_limiter.generate_captcha()
+            if verdict.needs_captcha:
+                captcha_question = rate_limiter.get_captcha_question()
             
             return toolkit.render('schemingdcat/rate_limited.html', extra_vars={
-                'needs_captcha': rate_limiter.needs_captcha(),
+                'needs_captcha': verdict.needs_captcha,
                 'captcha_question': captcha_question,
                 'captcha_error': False,
                 'search_limit': rate_limiter.search_limit,
@@ -35,18 +45,54 @@ def search(package_type='dataset'):
                 'captcha_after': rate_limiter.captcha_required_after
             })
         
-        # Log remaining searches before captcha
-        remaining = rate_limiter.get_remaining_searches()
-        if remaining <= 3 and remaining > 0:
+        # Warn about the remaining searches before captcha
+        if 0 < verdict.remaining <= 3:
             toolkit.h.flash_notice(
                 toolkit._('You have %(remaining)d searches remaining before verification is required.') % 
-                {'remaining': remaining}
+                {'remaining': verdict.remaining}
             )
+        else:
+            return _cached_search(package_type)
     
     # Call the original search function
     return core_search(package_type)
 
 
+def _cached_search(package_type):
+    """
+    Render the search page of an anonymous user, from the search page cache if possible.
+
+    Pages with flash messages are neither served from the cache nor cached. The CSRF token of
+    the cached pages is replaced by the token of each request.
+    """
+    ttl = sdct_config.search_cache_ttl
+    if ttl <= 0 or session.get('_flashes'):
+        return core_search(package_type)
+
+    key = search_page_cache.make_key(package_type, get_lang(), request.args)
+    page = search_page_cache.get(key)
+    if page is not None:
+        if CSRF_TOKEN_PLACEHOLDER in page and generate_csrf is not None:
+            page = page.replace(CSRF_TOKEN_PLACEHOLDER, generate_csrf())
+        return page
+
+    response = core_search(package_type)
+    if isinstance(response, str):
+        csrf_token = _get_rendered_csrf_token()
+        search_page_cache.set(
+            key, response.replace(csrf_token, CSRF_TOKEN_PLACEHOLDER) if csrf_token else response, ttl
+        )
+    return response
+
+
+def _get_rendered_csrf_token():
+    """
+    Get the CSRF token generated while rendering the current request, without generating one.
+    """
+    field_name = current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token')
+    return g.get(field_name) if field_name in g else None
+
+
 # Register the overridden route with higher priority
 def get_blueprints():
     return [dataset_rate_limit]
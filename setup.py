@@ -41,6 +41,7 @@ setup(
             'fiona>=1.8.0',
             'rasterio>=1.3.0',
             'pyproj>=3.2.0',
+            'shapely>=1.8.0',
             'GDAL>=3.0.0',
         ],
         'dev': [